@@ -0,0 +1,296 @@
+"""
+In-process stand-ins for the Vision, Storage, Translate and OpenAI clients,
+with configurable latency, jitter and error rates. They implement only the
+surface the PolyWord services use.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+class SimulatedServiceError(Exception):
+    """
+    Raised by a fake client to simulate a failed API call. It looks like a
+    throttled (429) response, so rate-limited services retry it.
+    """
+
+    status_code = 429
+
+class LatencyModel:
+    """
+    Latency of a simulated call: base + per_unit * units, scaled by a uniform
+    jitter of +/- jitter (a fraction), failing with probability error_rate.
+    """
+
+    def __init__(self, base: float = 0.0, per_unit: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, scale: float = 1.0):
+        self.base = base
+        self.per_unit = per_unit
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.scale = scale
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    def duration(self, units: float = 0, include_base: bool = True) -> float:
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        base = self.base if include_base else 0.0
+        return max((base + self.per_unit * units) * factor * self.scale, 0.0)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def wait(self, units: float = 0, name: str = 'call'):
+        time.sleep(self.duration(units))
+        if self.should_fail():
+            raise SimulatedServiceError(f'Simulated {name} failure')
+
+    async def wait_async(self, units: float = 0, name: str = 'call'):
+        await asyncio.sleep(self.duration(units))
+        if self.should_fail():
+            raise SimulatedServiceError(f'Simulated {name} failure')
+
+class FakeBlob:
+    def __init__(self, bucket, name: str):
+        self.bucket = bucket
+        self.name = name
+
+    @property
+    def _data(self) -> bytes:
+        return self.bucket.objects[self.name]
+
+    @property
+    def size(self) -> int:
+        return len(self._data)
+
+    @property
+    def md5_hash(self) -> str:
+        return hashlib.md5(self._data).hexdigest()
+
+    @property
+    def etag(self) -> str:
+        return self.md5_hash
+
+    crc32c = None
+    generation = 1
+    content_type = 'application/octet-stream'
+
+    def upload_from_string(self, data, content_type: str = None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bucket.client.latency.wait(len(data), 'storage upload')
+        self.bucket.objects[self.name] = data
+
+    def upload_from_filename(self, filename: str):
+        with open(filename, 'rb') as source:
+            self.upload_from_string(source.read())
+
+    def download_as_bytes(self, start: int = None, end: int = None, **kwargs) -> bytes:
+        data = self._data
+        if start is not None:
+            data = data[start:None if end is None else end + 1]
+        self.bucket.client.latency.wait(len(data), 'storage download')
+        return data
+
+    def open(self, mode: str = 'wb', **kwargs):
+        return FakeBlobWriter(self)
+
+    def delete(self):
+        # Raises KeyError for a missing object, like GCS raises NotFound.
+        del self.bucket.objects[self.name]
+
+class FakeBlobWriter:
+    """Buffers written chunks; like a resumable upload, the object only exists once closed."""
+
+    def __init__(self, blob: FakeBlob):
+        self.blob = blob
+        self.chunks = []
+
+    def write(self, data: bytes):
+        self.chunks.append(data)
+
+    def close(self):
+        self.blob.upload_from_string(b''.join(self.chunks))
+
+class FakeBucket:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.objects = client.objects.setdefault(name, {})
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str):
+        self.client.latency.wait(0, 'storage get_blob')
+        return FakeBlob(self, name) if name in self.objects else None
+
+    def list_blobs(self, prefix: str = ''):
+        self.client.latency.wait(0, 'storage list_blobs')
+        return [FakeBlob(self, name) for name in sorted(self.objects) if name.startswith(prefix)]
+
+class FakeStorageClient:
+    """Stores objects in memory; latency units are bytes transferred."""
+
+    def __init__(self, latency: LatencyModel = None):
+        self.latency = latency or LatencyModel()
+        self.objects = {}
+
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket(self, name)
+
+class FakeOperation:
+    def __init__(self, ready_at: float, complete, error: Exception = None):
+        self._ready_at = ready_at
+        self._complete = complete
+        self._error = error
+        self._completed = False
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        if time.monotonic() < self._ready_at:
+            return False
+        with self._lock:
+            if not self._completed:
+                self._completed = True
+                if not self._error:
+                    self._complete()
+        return True
+
+    def result(self, timeout: float = None):
+        remaining = self._ready_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        self.done()
+        if self._error:
+            raise self._error
+        return SimpleNamespace(responses=[])
+
+class FakeVisionClient:
+    """
+    Simulates async_batch_annotate_files: after the simulated latency (units
+    are pages), writes Vision-style output-N-to-M.json shards of synthetic
+    page text to the fake storage destination of each request.
+    """
+
+    def __init__(self, storage_client: FakeStorageClient, documents: dict,
+                 latency: LatencyModel = None):
+        self.storage_client = storage_client
+        self.documents = documents
+        self.latency = latency or LatencyModel()
+
+    def async_batch_annotate_files(self, requests: list) -> FakeOperation:
+        pages = sum(
+            len(self.documents[request.input_config.gcs_source.uri]) for request in requests
+        )
+        duration = self.latency.duration(pages)
+        error = SimulatedServiceError('Simulated OCR failure') if self.latency.should_fail() else None
+
+        def complete():
+            for request in requests:
+                self._write_shards(request)
+
+        return FakeOperation(time.monotonic() + duration, complete, error)
+
+    def _write_shards(self, request):
+        page_texts = self.documents[request.input_config.gcs_source.uri]
+        destination = request.output_config.gcs_destination.uri
+        batch_size = request.output_config.batch_size or 20
+        bucket_name, _, prefix = destination[len('gs://'):].partition('/')
+        bucket = self.storage_client.bucket(bucket_name)
+        for start in range(0, len(page_texts), batch_size):
+            shard = page_texts[start:start + batch_size]
+            document = {'responses': [
+                {'fullTextAnnotation': {'text': text}, 'context': {'pageNumber': start + offset + 1}}
+                for offset, text in enumerate(shard)
+            ]}
+            name = f'{prefix}output-{start + 1}-to-{start + len(shard)}.json'
+            bucket.objects[name] = json.dumps(document).encode('utf-8')
+
+class FakeTranslateClient:
+    """Echoes text with a language tag; latency units are characters."""
+
+    def __init__(self, latency: LatencyModel = None):
+        self.latency = latency or LatencyModel()
+
+    def translate(self, values, target_language: str):
+        texts = values if isinstance(values, list) else [values]
+        self.latency.wait(sum(len(text) for text in texts), 'translate')
+        results = [
+            {'translatedText': f'[{target_language}] {text}', 'input': text} for text in texts
+        ]
+        return results if isinstance(values, list) else results[0]
+
+    def detect_language(self, values):
+        # Synthetic documents are lorem ipsum; text already translated keeps its tag.
+        texts = values if isinstance(values, list) else [values]
+        self.latency.wait(sum(len(text) for text in texts), 'detect_language')
+        results = [
+            {
+                'language': text[1:text.index(']')] if text.startswith('[') else 'la',
+                'confidence': 1.0, 'input': text
+            }
+            for text in texts
+        ]
+        return results if isinstance(values, list) else results[0]
+
+class FakeOpenAIClient:
+    """
+    Mimics client.chat.completions.create, echoing the user message; latency
+    units are completion tokens (estimated as characters / 4).
+    """
+
+    def __init__(self, latency: LatencyModel = None):
+        self.latency = latency or LatencyModel()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: list, **kwargs):
+        self.latency.wait(len(messages[-1]['content']) // 4, 'chat completion')
+        return echo_completion(messages)
+
+class FakeAsyncOpenAIClient:
+    """
+    Same as FakeOpenAIClient with a coroutine create, like AsyncOpenAI. With
+    stream=True the echo arrives in pieces: the first after the base latency,
+    each further one after the per-token latency of its tokens.
+    """
+
+    STREAM_PIECE_CHARS = 64
+
+    def __init__(self, latency: LatencyModel = None):
+        self.latency = latency or LatencyModel()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        if stream:
+            await self.latency.wait_async(0, 'chat completion')
+            return self._stream(messages)
+        await self.latency.wait_async(len(messages[-1]['content']) // 4, 'chat completion')
+        return echo_completion(messages)
+
+    async def _stream(self, messages: list):
+        text = messages[-1]['content']
+        # Sleep until each piece's due time so timer overshoot does not accumulate.
+        due = time.monotonic()
+        for start in range(0, len(text), self.STREAM_PIECE_CHARS):
+            piece = text[start:start + self.STREAM_PIECE_CHARS]
+            due += self.latency.duration(len(piece) // 4, include_base=False)
+            await asyncio.sleep(max(due - time.monotonic(), 0))
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None
+            )
+        yield SimpleNamespace(choices=[], usage=echo_completion(messages).usage)
+
+def echo_completion(messages: list):
+    """Returns a chat completion echoing the last message, with estimated usage."""
+    text = messages[-1]['content']
+    prompt_tokens = sum(len(message['content']) for message in messages) // 4
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(text) // 4)
+    )
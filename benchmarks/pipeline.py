@@ -0,0 +1,240 @@
+"""
+Offline throughput benchmark for PDFProcessor.
+
+Runs the real pipeline against the in-process fake clients in
+benchmarks/fakes.py, so no GCP or OpenAI credentials are needed, and reports
+documents/minute, per-stage and per-service p50/p99 latency and peak Python
+memory for synthetic documents of each requested size. Synthetic pages carry
+a running header and a page-number footer, like scanned books and reports.
+
+    python -m benchmarks.pipeline --pages 1 50 500 --documents 4 --concurrency 2
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fakes import (
+    FakeAsyncOpenAIClient, FakeOpenAIClient, FakeStorageClient, FakeTranslateClient, FakeVisionClient, LatencyModel
+)
+from polyword.metrics import MetricsRegistry
+from polyword.processor import PDFProcessor
+from polyword.ratelimit import RateLimiter
+from polyword.services.chatgpt import ChatGPTService
+from polyword.services.dedup import DeduplicationService
+from polyword.services.ocr import OCRService
+from polyword.services.storage import StorageService
+from polyword.services.translate import TranslationService
+
+BUCKET = 'benchmark-bucket'
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud'
+).split()
+
+def synthetic_pages(num_pages: int, page_chars: int, seed: int) -> list:
+    """
+    Returns num_pages page texts of roughly page_chars characters in paragraphs,
+    each between the same header and a page-number footer.
+    """
+    rng = random.Random(seed)
+    header = f'Synthetic report {seed} - {num_pages} pages'
+    pages = []
+    for page_number in range(1, num_pages + 1):
+        paragraphs = [header]
+        length = 0
+        while length < page_chars:
+            paragraph = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        paragraphs.append(str(page_number))
+        pages.append('\n\n'.join(paragraphs))
+    return pages
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+def build_processor(args, documents: dict, metrics: MetricsRegistry) -> PDFProcessor:
+    def latency(base, per_unit, error_rate=0.0):
+        return LatencyModel(base, per_unit, args.jitter, error_rate, args.latency_scale)
+
+    def rate_limiter(name, units_per_minute):
+        # Backoff is scaled with the simulated latencies.
+        return RateLimiter(
+            name, units_per_minute=units_per_minute,
+            base_delay=args.latency_scale, max_delay=60 * args.latency_scale, metrics=metrics
+        )
+
+    storage_client = FakeStorageClient(latency(args.storage_latency, 1 / args.storage_bandwidth))
+    for uri in documents:
+        storage_client.bucket(BUCKET).objects[uri.split('/', 3)[3]] = uri.encode('utf-8')
+    vision_client = FakeVisionClient(
+        storage_client, documents, latency(args.ocr_latency, args.ocr_per_page, args.ocr_error_rate)
+    )
+    translate_client = FakeTranslateClient(
+        latency(args.translate_latency, args.translate_per_char, args.translate_error_rate)
+    )
+    openai_latency = latency(args.openai_latency, args.openai_per_token, args.openai_error_rate)
+    openai_client = FakeOpenAIClient(openai_latency)
+    async_openai_client = FakeAsyncOpenAIClient(openai_latency)
+    translation_service = TranslationService(
+        translate_client=translate_client, metrics=metrics,
+        rate_limiter=rate_limiter('translate', args.translate_chars_per_minute)
+    )
+    return PDFProcessor(
+        OCRService(
+            vision_client=vision_client, metrics=metrics, poll_interval=args.latency_scale
+        ),
+        translation_service,
+        StorageService(storage_client=storage_client, metrics=metrics),
+        ChatGPTService(
+            openai_client=openai_client, async_openai_client=async_openai_client,
+            metrics=metrics,
+            rate_limiter=rate_limiter('openai', args.openai_tokens_per_minute)
+        ),
+        metrics=metrics,
+        deduplication_service=DeduplicationService(
+            translation_service, detect_language=args.detect_language, metrics=metrics
+        ) if args.dedup or args.detect_language else None
+    )
+
+def run_scenario(num_pages: int, args) -> dict:
+    """Processes args.documents synthetic documents of num_pages pages each."""
+    documents = {
+        f'gs://{BUCKET}/input/{num_pages}p-{index}.pdf':
+            synthetic_pages(num_pages, args.page_chars, seed=index)
+        for index in range(args.documents)
+    }
+    samples = defaultdict(list)
+    characters = defaultdict(float)
+
+    def collect(kind, name, value, labels):
+        if name == 'polyword_characters_translated_total':
+            characters['translated'] += value
+        elif name == 'polyword_characters_saved_total':
+            characters['saved'] += value
+        elif name == 'polyword_stage_seconds':
+            samples[f"stage:{labels['stage']}"].append(value)
+        elif name == 'polyword_api_call_seconds':
+            samples[f"call:{labels['service']}.{labels['operation']}"].append(value)
+
+    metrics = MetricsRegistry()
+    metrics.add_hook(collect)
+    processor = build_processor(args, documents, metrics)
+
+    def process(index_uri):
+        index, uri = index_uri
+        started = time.perf_counter()
+        streamed = []
+
+        def on_refined_text(language, text):
+            if not streamed:
+                streamed.append(text)
+                samples['first refined text'].append(time.perf_counter() - started)
+
+        return processor.process_pdf(
+            uri, BUCKET, f'output/{num_pages}p-{index}',
+            args.language[0] if len(args.language) == 1 else args.language,
+            pipelined=args.pipelined, on_refined_text=on_refined_text if args.stream else None
+        )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    errors = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(process, item) for item in enumerate(documents)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as error:
+                errors.append(error)
+    failed = len(errors)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'pages': num_pages,
+        'documents': args.documents,
+        'failed': failed,
+        'errors': Counter(type(error).__name__ for error in errors),
+        'first_error': f'{type(errors[0]).__name__}: {errors[0]}' if errors else None,
+        'seconds': elapsed,
+        'docs_per_minute': (args.documents - failed) / elapsed * 60,
+        'peak_mb': peak / 1024 / 1024,
+        'characters_translated': characters['translated'],
+        'characters_saved': characters['saved'],
+        'latencies': {
+            name: (percentile(values, 50), percentile(values, 99), len(values))
+            for name, values in sorted(samples.items())
+        },
+    }
+
+def print_report(result: dict):
+    print(
+        f"\n{result['pages']}-page documents: {result['documents']} run, {result['failed']} failed, "
+        f"{result['seconds']:.2f}s, {result['docs_per_minute']:.2f} docs/min, "
+        f"peak {result['peak_mb']:.1f} MB"
+    )
+    if result['failed']:
+        counts = ', '.join(f'{name} x{count}' for name, count in result['errors'].most_common())
+        print(f"  errors: {counts}; first: {result['first_error']}")
+    print(
+        f"  characters translated: {result['characters_translated']:.0f}, "
+        f"saved: {result['characters_saved']:.0f}"
+    )
+    print(f"  {'stage / call':<48}{'p50 (s)':>10}{'p99 (s)':>10}{'count':>8}")
+    for name, (p50, p99, count) in result['latencies'].items():
+        print(f"  {name:<48}{p50:>10.3f}{p99:>10.3f}{count:>8}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline PDFProcessor throughput benchmark.')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 50, 500])
+    parser.add_argument('--documents', type=int, default=4, help='documents per scenario')
+    parser.add_argument('--concurrency', type=int, default=2, help='documents processed at once')
+    parser.add_argument('--page-chars', type=int, default=1500)
+    parser.add_argument('--language', nargs='+', default=['en'],
+                        help='target languages, all served by one OCR pass')
+    parser.add_argument('--pipelined', action='store_true')
+    parser.add_argument('--dedup', action='store_true',
+                        help='translate repeated segments once')
+    parser.add_argument('--detect-language', action='store_true',
+                        help='also skip segments already in the target language (implies --dedup)')
+    parser.add_argument('--stream', action='store_true',
+                        help='stream the refinement and report time to first refined text')
+    parser.add_argument('--jitter', type=float, default=0.2, help='fractional latency jitter')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='multiplies every simulated latency')
+    parser.add_argument('--storage-latency', type=float, default=0.03)
+    parser.add_argument('--storage-bandwidth', type=float, default=50e6, help='bytes/second')
+    parser.add_argument('--ocr-latency', type=float, default=2.0)
+    parser.add_argument('--ocr-per-page', type=float, default=0.05)
+    parser.add_argument('--ocr-error-rate', type=float, default=0.0)
+    parser.add_argument('--translate-latency', type=float, default=0.15)
+    parser.add_argument('--translate-per-char', type=float, default=2e-6)
+    parser.add_argument('--translate-error-rate', type=float, default=0.0)
+    parser.add_argument('--translate-chars-per-minute', type=float,
+                        help='Translate quota enforced by the rate limiter')
+    parser.add_argument('--openai-latency', type=float, default=0.5)
+    parser.add_argument('--openai-per-token', type=float, default=0.002)
+    parser.add_argument('--openai-error-rate', type=float, default=0.0)
+    parser.add_argument('--openai-tokens-per-minute', type=float,
+                        help='OpenAI quota enforced by the rate limiter')
+    args = parser.parse_args()
+    if args.pipelined and args.stream:
+        parser.error('--stream is not supported with --pipelined')
+    return args
+
+def main():
+    args = parse_args()
+    for num_pages in args.pages:
+        print_report(run_scenario(num_pages, args))
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,17 @@
+import time
+_started_at = time.perf_counter()
+
+import json
 import os
 import uuid
-from fastapi import FastAPI, UploadFile, HTTPException
+from fastapi import FastAPI, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from polyword.services.ocr import OCRService
-from polyword.services.translate import TranslationService
-from polyword.services.storage import StorageService
-from polyword.services.chatgpt import ChatGPTService
-from polyword.processor import PDFProcessor
+from polyword.services.storage import UPLOAD_CHUNK_SIZE
+from polyword.registry import build_default_registry
+from polyword.jobs import JobManager, QueueFullError
+from polyword.metrics import REGISTRY
 
 # Set up Google Cloud credentials
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'gcpkey.json'
@@ -24,89 +27,181 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/", StaticFiles(directory="polyword/static"), name="static")
+# Services are built on first use; SDKs are only imported when a client is needed
+services = build_default_registry()
+# Jobs run as tasks on the event loop; max_workers bounds how many run at once
+job_manager = JobManager(
+    max_workers=int(os.getenv('POLYWORD_MAX_WORKERS', '8')),
+    max_queue_depth=int(os.getenv('POLYWORD_MAX_QUEUE_DEPTH', '20'))
+)
 
-# Initialize services
-ocr_service = OCRService()
-translation_service = TranslationService()
-storage_service = StorageService()
-chatgpt_service = ChatGPTService()
-processor = PDFProcessor(ocr_service, translation_service, storage_service, chatgpt_service)
+@app.on_event("startup")
+async def report_startup_time():
+    print(f'PolyWord API started in {time.perf_counter() - _started_at:.3f}s')
 
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to PolyWord API"}
 
-@app.post("/upload")
-async def upload_file(file: UploadFile):
+@app.post("/upload", status_code=202)
+async def upload_file(file: UploadFile, languages: str = "en"):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-    
-    # Create a unique filename
-    unique_filename = f"{uuid.uuid4()}_{file.filename}"
-    temp_path = f"/tmp/{unique_filename}"
-    
+    if job_manager.is_full():
+        raise HTTPException(status_code=429, detail="Job queue is full")
+    # Comma-separated target languages, e.g. ?languages=en,de,fr; one OCR pass serves them all
+    target_languages = [language.strip() for language in languages.split(',') if language.strip()]
+    if not target_languages:
+        raise HTTPException(status_code=400, detail="At least one target language is required")
+    if len(target_languages) == 1:
+        target_languages = target_languages[0]
+
+    # Each job gets its own prefix so OCR outputs of other jobs are never read
+    job_id = uuid.uuid4().hex
+    input_bucket = 'polyword-bucket'
+    output_prefix = f"uploads/{job_id}"
+
+    async def read_chunks():
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
     try:
-        # Save the uploaded file temporarily
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Upload to GCS
-        input_bucket = 'polyword-bucket'
-        output_prefix = 'uploads'
-        gcs_path = f"{output_prefix}/{unique_filename}"
-        pdf_uri = storage_service.upload_pdf_to_gcs(temp_path, input_bucket, gcs_path)
-        
-        # Process the PDF
-        result = processor.process_pdf(
+        # Stream the upload to GCS chunk by chunk instead of buffering the whole file
+        pdf_uri = await services.get('storage').upload_async_stream(
+            read_chunks(), input_bucket, f"{output_prefix}/{file.filename}"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def run_job(job, progress_callback):
+        return await services.get('processor').process_pdf_async(
             pdf_uri,
             input_bucket,
             output_prefix,
-            'en'  # Default to English
+            target_languages,
+            progress_callback=progress_callback,
+            on_refined_text=lambda language, text: job.publish(
+                'refined', {'language': language, 'text': text}
+            )
         )
-        
-        # Clean up temp file
-        os.remove(temp_path)
-        
-        return {
-            "message": "File processed successfully",
-            "original_text": result['original_text_uri'],
-            "translated_text": result['translated_text_uri'],
-            "refined_text": result['refined_text_uri']
-        }
-        
-    except Exception as e:
-        # Clean up temp file if it exists
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        job = job_manager.submit_async(file.filename, run_job, job_id=job_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {
+        "message": "File queued for processing",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+# Server-sent events of a job: 'stage' (stage name), 'refined' (the language and
+# the next piece of its refined markdown as it is generated) and a final 'completed' (result) or
+# 'failed' (error). A reconnecting client resumes after its Last-Event-ID. The
+# 'refined' pieces are dropped once the job finishes; its result has the full text.
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last_event_id = request.headers.get("last-event-id", "")
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+
+    async def stream():
+        async for event_id, event, data in job.follow(start):
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
 
 @app.get("/download/{file_path:path}")
-async def download_file(file_path: str):
+async def download_file(file_path: str, request: Request):
     try:
-        bucket = storage_service.client.get_bucket('polyword-bucket')
-        blob = bucket.blob(file_path)
-        
-        if not blob.exists():
-            raise HTTPException(status_code=404, detail="File not found")
-        
-        # Get the file content
-        content = blob.download_as_bytes()
-        
-        # Determine content type
-        content_type = "application/octet-stream"
-        if file_path.endswith('.txt'):
-            content_type = "text/plain"
-        elif file_path.endswith('.pdf'):
-            content_type = "application/pdf"
-        
-        return JSONResponse(
-            content={
-                "content": content.decode('utf-8'),
-                "filename": os.path.basename(file_path)
-            }
-        )
+        storage_service = services.get('storage')
+        blob = await storage_service.get_blob_async('polyword-bucket', file_path)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    if blob is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = f'"{blob.etag}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    # Determine content type
+    content_type = blob.content_type or "application/octet-stream"
+    if file_path.endswith('.txt'):
+        content_type = "text/plain; charset=utf-8"
+    elif file_path.endswith('.pdf'):
+        content_type = "application/pdf"
+    headers["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
+
+    start, end, status_code = 0, blob.size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, blob.size)
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{blob.size}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+    headers["Content-Length"] = str(end - start + 1 if blob.size else 0)
+
+    return StreamingResponse(
+        storage_service.iter_blob_chunks_async(blob, start, end),
+        status_code=status_code,
+        media_type=content_type,
+        headers=headers
+    )
+
+# Mount static files last: a mount at "/" matches every path, so routes
+# registered after it would never be reached
+app.mount("/", StaticFiles(directory="polyword/static"), name="static")
+
+def _parse_range(range_header: str, size: int):
+    """
+    Parses a single 'bytes=start-end' range header into an inclusive (start, end)
+    pair, or returns None if it cannot be satisfied. Multi-range requests are
+    answered with the whole file.
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip() != 'bytes':
+        return None
+    if ',' in spec:
+        return 0, size - 1
+    first, _, last = spec.strip().partition('-')
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
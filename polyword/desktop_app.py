@@ -2,18 +2,28 @@ import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import webbrowser
 import sys
-from polyword.services.ocr import OCRService
-from polyword.services.translate import TranslationService
-from polyword.services.storage import StorageService
-from polyword.services.chatgpt import ChatGPTService
-from polyword.processor import PDFProcessor
+import uuid
+from polyword.registry import build_default_registry
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Share of a file's progress reached when each pipeline stage starts.
+STAGE_PROGRESS = {
+    'upload': 0,
+    'ocr': 5,
+    'dedup': 35,
+    'translate': 40,
+    'refine': 55,
+    'render': 85,
+    'save': 95,
+}
+
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
     try:
@@ -39,25 +49,23 @@ class PolyWordApp:
             
         os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
         
-        # Initialize services
-        self.ocr_service = OCRService()
-        self.translation_service = TranslationService()
-        self.storage_service = StorageService()
-        self.chatgpt_service = ChatGPTService()
-        self.processor = PDFProcessor(
-            self.ocr_service,
-            self.translation_service,
-            self.storage_service,
-            self.chatgpt_service
-        )
+        # Services (and their SDKs) are built on first use, off the UI thread
+        self.services = build_default_registry()
         
         # Initialize variables
-        self.selected_file = None
-        self.processing_results = {}
+        self.queue = {}  # queue item id -> {'path', 'status', 'progress', 'results'}
         self.bucket_name = 'polyword-bucket'
         self.output_prefix = 'results'
+        self.target_language = 'en'  # Default to English
+        
+        # Files are processed by a bounded pool so a folder of scans does not
+        # start every upload and OCR job at once
+        self.max_workers = int(os.getenv('POLYWORD_DESKTOP_WORKERS', '3'))
+        self.download_workers = int(os.getenv('POLYWORD_DOWNLOAD_WORKERS', '8'))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
         
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def setup_ui(self):
         # Main frame
@@ -65,25 +73,37 @@ class PolyWordApp:
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # File selection
-        ttk.Label(main_frame, text="Select PDF File:").grid(row=0, column=0, sticky=tk.W, pady=5)
-        self.file_label = ttk.Label(main_frame, text="No file selected")
+        ttk.Label(main_frame, text="Select PDF Files:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.file_label = ttk.Label(main_frame, text="No files queued")
         self.file_label.grid(row=0, column=1, sticky=tk.W, pady=5)
         ttk.Button(main_frame, text="Browse", command=self.browse_file).grid(row=0, column=2, padx=5)
+        ttk.Button(main_frame, text="Add Folder", command=self.browse_folder).grid(row=0, column=3, padx=5)
+        
+        # Queue of files with their current stage and progress
+        queue_frame = ttk.LabelFrame(main_frame, text="Queue", padding="5")
+        queue_frame.grid(row=1, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        self.queue_list = ttk.Treeview(queue_frame, columns=("File", "Status", "Progress"), show="headings", height=8)
+        self.queue_list.heading("File", text="File")
+        self.queue_list.heading("Status", text="Status")
+        self.queue_list.heading("Progress", text="Progress")
+        self.queue_list.column("Progress", width=80, anchor=tk.E)
+        self.queue_list.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Upload button
-        self.upload_btn = ttk.Button(main_frame, text="Upload", command=self.upload_file, state=tk.DISABLED)
-        self.upload_btn.grid(row=1, column=0, columnspan=3, pady=10)
+        self.upload_btn = ttk.Button(main_frame, text="Process Queue", command=self.upload_file, state=tk.DISABLED)
+        self.upload_btn.grid(row=2, column=0, columnspan=4, pady=10)
         
-        # Progress bar
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        # Overall progress of the queue
+        self.progress = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
+        self.progress.grid(row=3, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=5)
         
         # Results frame
         results_frame = ttk.LabelFrame(main_frame, text="Processing Results", padding="5")
-        results_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        results_frame.grid(row=4, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
         
         # Results list
-        self.results_list = ttk.Treeview(results_frame, columns=("Type", "Status"), show="headings")
+        self.results_list = ttk.Treeview(results_frame, columns=("Document", "Type", "Status"), show="headings")
+        self.results_list.heading("Document", text="Document")
         self.results_list.heading("Type", text="File Type")
         self.results_list.heading("Status", text="Status")
         self.results_list.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -94,68 +114,127 @@ class PolyWordApp:
         
         # Configure grid weights
         main_frame.columnconfigure(1, weight=1)
+        queue_frame.columnconfigure(0, weight=1)
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(0, weight=1)
     
     def browse_file(self):
-        file_path = filedialog.askopenfilename(
+        file_paths = filedialog.askopenfilenames(
             filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
         )
-        if file_path:
-            self.selected_file = file_path
-            self.file_label.config(text=Path(file_path).name)
+        self.add_files(file_paths)
+    
+    def browse_folder(self):
+        folder = filedialog.askdirectory()
+        if folder:
+            self.add_files(sorted(str(path) for path in Path(folder).glob("*.pdf")))
+    
+    def add_files(self, file_paths):
+        queued = {job['path'] for job in self.queue.values()}
+        for file_path in file_paths:
+            if file_path in queued:
+                continue
+            queued.add(file_path)
+            item = self.queue_list.insert("", tk.END, values=(Path(file_path).name, "Pending", "0%"))
+            self.queue[item] = {'path': file_path, 'status': 'pending', 'progress': 0, 'results': {}}
+        pending = sum(job['status'] == 'pending' for job in self.queue.values())
+        self.file_label.config(text=f"{len(self.queue)} files queued, {pending} pending")
+        if pending:
             self.upload_btn.config(state=tk.NORMAL)
     
     def upload_file(self):
-        if not self.selected_file:
+        """Submits every pending file in the queue to the worker pool."""
+        pending = [item for item, job in self.queue.items() if job['status'] == 'pending']
+        if not pending:
             return
         
         self.upload_btn.config(state=tk.DISABLED)
-        self.progress.start()
-        
-        def process_file():
-            try:
-                # Upload file to GCS
-                dest_blob_name = f"{self.output_prefix}/{Path(self.selected_file).name}"
-                gcs_uri = self.storage_service.upload_pdf_to_gcs(
-                    self.selected_file,
-                    self.bucket_name,
-                    dest_blob_name
-                )
-                
-                # Process the file
-                results = self.processor.process_pdf(
-                    gcs_uri,
-                    self.bucket_name,
-                    self.output_prefix,
-                    'en'  # Default to English
-                )
-                
-                self.processing_results = results
-                
-                # Update UI in the main thread
-                self.root.after(0, self.update_results_ui)
-                
-            except Exception as error:
-                error_msg = str(error)
-                self.root.after(0, lambda: messagebox.showerror("Error", error_msg))
-            finally:
-                self.root.after(0, self.progress.stop)
-                self.root.after(0, lambda: self.upload_btn.config(state=tk.NORMAL))
-        
-        threading.Thread(target=process_file, daemon=True).start()
+        for item in pending:
+            self.queue[item]['status'] = 'queued'
+            self.set_progress(item, "Queued", 0)
+            self.executor.submit(self.process_file, item)
+        self.file_label.config(text=f"{len(self.queue)} files queued, 0 pending")
     
-    def update_results_ui(self):
-        # Clear existing items
-        for item in self.results_list.get_children():
-            self.results_list.delete(item)
+    def process_file(self, item):
+        """Uploads and processes one queued file. Runs in the worker pool."""
+        file_path = self.queue[item]['path']
+        # Each run gets its own prefix, like the API's uploads/<job_id>, so files
+        # with the same name and earlier runs never share uploads or OCR shards
+        output_prefix = f"{self.output_prefix}/{uuid.uuid4().hex}"
+        
+        def on_stage(stage):
+            # Stages of a multi-language run are named e.g. 'translate_de'
+            name = stage.split('_')[0]
+            if name in STAGE_PROGRESS:
+                self.root.after(0, self.set_progress, item, stage.replace('_', ' ').title(), STAGE_PROGRESS[name])
+        
+        try:
+            on_stage('upload')
+            # Upload file to GCS
+            dest_blob_name = f"{output_prefix}/{Path(file_path).name}"
+            gcs_uri = self.services.get('storage').upload_pdf_to_gcs(
+                file_path,
+                self.bucket_name,
+                dest_blob_name
+            )
+            
+            # Process the file
+            results = self.services.get('processor').process_pdf(
+                gcs_uri,
+                self.bucket_name,
+                output_prefix,
+                self.target_language,
+                progress_callback=on_stage
+            )
+            
+            # Update UI in the main thread
+            self.root.after(0, self.finish_file, item, results, None)
         
-        # Add new results
-        for key, uri in self.processing_results.items():
+        except Exception as error:
+            self.root.after(0, self.finish_file, item, {}, str(error))
+    
+    def set_progress(self, item, status, progress):
+        job = self.queue[item]
+        # Stages of several languages interleave, so progress only moves forward
+        job['progress'] = max(job['progress'], progress)
+        self.queue_list.item(item, values=(Path(job['path']).name, status, f"{job['progress']}%"))
+        self.update_overall_progress()
+    
+    def update_overall_progress(self):
+        active = [job for job in self.queue.values() if job['status'] != 'pending']
+        if active:
+            # Failed files count as finished so the bar can still reach the end
+            self.progress['value'] = sum(
+                100 if job['status'] == 'failed' else job['progress'] for job in active
+            ) / len(active)
+    
+    def finish_file(self, item, results, error):
+        job = self.queue[item]
+        job['results'] = results
+        if error:
+            job['status'] = 'failed'
+            self.queue_list.item(item, values=(Path(job['path']).name, f"Failed: {error}", f"{job['progress']}%"))
+            self.update_overall_progress()
+        else:
+            job['status'] = 'done'
+            self.set_progress(item, "Done", 100)
+            self.update_results_ui(Path(job['path']).name, results)
+        
+        jobs = self.queue.values()
+        if all(job['status'] in ('done', 'failed') for job in jobs):
+            failed = [Path(job['path']).name for job in jobs if job['status'] == 'failed']
+            if failed:
+                messagebox.showerror("Error", "Processing failed for:\n" + "\n".join(failed))
+    
+    def update_results_ui(self, document, results):
+        # Add the results of a finished file
+        for key, uri in results.items():
+            if not key.endswith('_uri'):
+                continue
             file_type = key.replace('_uri', '').replace('_', ' ').title()
             if 'pdf' in key.lower():
                 file_type = "PDF Document"
-            self.results_list.insert("", tk.END, values=(file_type, "Ready"), tags=(uri,))
+            self.results_list.insert("", tk.END, values=(document, file_type, "Ready"), tags=(uri,))
         
         self.download_btn.config(state=tk.NORMAL)
     
@@ -169,30 +248,61 @@ class PolyWordApp:
         if not download_dir:
             return
         
+        downloads = []
+        for item in selected_items:
+            document = self.results_list.item(item)['values'][0]
+            uri = self.results_list.item(item)['tags'][0]
+            # Every document has e.g. refined_text_en.pdf, so prefix the document name,
+            # and the start of its run id (results/<run id>/...) as files from
+            # different folders can share a name
+            run_id, blob_name = uri.split('/')[-2:]
+            file_name = f"{Path(str(document)).stem}_{run_id[:8]}_{blob_name}"
+            downloads.append((item, uri, os.path.join(download_dir, file_name)))
+            self.results_list.set(item, "Status", "Queued")
+        self.download_btn.config(state=tk.DISABLED)
+        
+        def download_file(item, uri, local_path):
+            self.root.after(0, self.results_list.set, item, "Status", "Downloading")
+            # Download from GCS
+            bucket_name = uri.split('/')[2]
+            blob_name = '/'.join(uri.split('/')[3:])
+            bucket = self.services.get('storage').bucket(bucket_name)
+            blob = bucket.blob(blob_name)
+            blob.download_to_filename(local_path)
+        
         def download_files():
-            try:
-                for item in selected_items:
-                    uri = self.results_list.item(item)['tags'][0]
-                    file_name = uri.split('/')[-1]
-                    local_path = os.path.join(download_dir, file_name)
-                    
-                    # Download from GCS
-                    bucket_name = uri.split('/')[2]
-                    blob_name = '/'.join(uri.split('/')[3:])
-                    bucket = self.storage_service.client.get_bucket(bucket_name)
-                    blob = bucket.blob(blob_name)
-                    blob.download_to_filename(local_path)
-                
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+                futures = {executor.submit(download_file, *download): download[0] for download in downloads}
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        future.result()
+                        self.root.after(0, self.results_list.set, item, "Status", "Downloaded")
+                    except Exception as e:
+                        errors.append(str(e))
+                        self.root.after(0, self.results_list.set, item, "Status", "Failed")
+            
+            self.root.after(0, lambda: self.download_btn.config(state=tk.NORMAL))
+            if errors:
+                self.root.after(0, lambda: messagebox.showerror("Error", "\n".join(errors)))
+            else:
                 self.root.after(0, lambda: messagebox.showinfo("Success", "Files downloaded successfully"))
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
         
         threading.Thread(target=download_files, daemon=True).start()
+    
+    def on_close(self):
+        # Files not yet started are dropped; running ones finish in the background
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
 def main():
+    # PDF rendering starts worker processes; in the PyInstaller build they
+    # would otherwise each launch another copy of the app.
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = PolyWordApp(root)
     root.mainloop()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
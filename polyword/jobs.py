@@ -0,0 +1,221 @@
+import asyncio
+import bisect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth."""
+
+class Job:
+    def __init__(self, job_id: str, filename: str):
+        self.id = job_id
+        self.filename = filename
+        self.status = 'queued'
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # (event id, event, data) in id order; ids stay stable when events are dropped.
+        self.events = []
+        self._next_event_id = 0
+        self._followers = set()
+        self._dropped = set()
+        self._events_lock = threading.Lock()
+
+    def publish(self, event: str, data):
+        """
+        Appends an event to the job's log and wakes its followers. May be
+        called from any thread.
+        """
+        with self._events_lock:
+            self.events.append((self._next_event_id, event, data))
+            self._next_event_id += 1
+            followers = list(self._followers)
+        for loop, wakeup in followers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(wakeup.set)
+
+    def drop_events(self, event: str):
+        """
+        Forgets the logged events of one kind, e.g. the 'refined' text pieces
+        of a finished job, whose full text is saved with its result. While
+        followers are still reading, this waits until the last one stops.
+        """
+        with self._events_lock:
+            self._dropped.add(event)
+            self._drop_unfollowed()
+
+    def _drop_unfollowed(self):
+        # Must be called with the events lock held.
+        if self._dropped and not self._followers:
+            self.events = [entry for entry in self.events if entry[1] not in self._dropped]
+
+    async def follow(self, start: int = 0, poll_interval: float = 1.0):
+        """
+        Yields (event id, event, data) for the job's events from id start, then
+        for new ones as they are published, until the job has finished. Each
+        follower has its own wakeup, so none misses an event another consumed.
+        """
+        follower = (asyncio.get_running_loop(), asyncio.Event())
+        with self._events_lock:
+            self._followers.add(follower)
+        try:
+            next_id = start
+            while True:
+                follower[1].clear()
+                # The final event is published before finished_at is set, so a
+                # read after seeing finished_at includes it.
+                finished = self.finished_at is not None
+                with self._events_lock:
+                    # (next_id,) sorts before every entry with that id.
+                    pending = self.events[bisect.bisect_left(self.events, (next_id,)):]
+                for entry in pending:
+                    yield entry
+                    next_id = entry[0] + 1
+                if finished:
+                    return
+                try:
+                    await asyncio.wait_for(follower[1].wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._events_lock:
+                self._followers.discard(follower)
+                self._drop_unfollowed()
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'stage': self.stage,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class JobManager:
+    """
+    Runs submitted jobs on a bounded worker pool and tracks their status.
+    Rejects new jobs with QueueFullError once max_queue_depth jobs are waiting.
+    Coroutine jobs (submit_async) run as tasks on the caller's event loop
+    instead, with at most max_workers running at once.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue_depth: int = 20, max_jobs: int = 1000):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = OrderedDict()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._slots = None
+        self._tasks = set()
+
+    def submit(self, filename: str, work: Callable[[Job, Callable[[str], None]], dict],
+               job_id: str = None) -> Job:
+        """
+        Enqueues work(job, progress_callback) and returns the job immediately.
+        The return value of work becomes the job result.
+        """
+        job = self._enqueue(filename, job_id)
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def submit_async(self, filename: str,
+                     work: Callable[[Job, Callable[[str], None]], Awaitable[dict]],
+                     job_id: str = None) -> Job:
+        """
+        Same as submit for a coroutine function; must be called from the event
+        loop the job should run on.
+        """
+        job = self._enqueue(filename, job_id)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        task = asyncio.get_running_loop().create_task(self._run_async(job, work))
+        # The loop only keeps weak references to tasks.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def is_full(self) -> bool:
+        """Returns True if a submit right now would be rejected."""
+        with self._lock:
+            return self._queued >= self.max_queue_depth
+
+    def get(self, job_id: str):
+        """Returns the job with the given id, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _enqueue(self, filename: str, job_id: str) -> Job:
+        with self._lock:
+            if self._queued >= self.max_queue_depth:
+                raise QueueFullError(f'Job queue is full ({self.max_queue_depth} jobs waiting)')
+            job = Job(job_id or uuid.uuid4().hex, filename)
+            self._jobs[job.id] = job
+            self._queued += 1
+            self._prune()
+        return job
+
+    def _start(self, job: Job) -> Callable[[str], None]:
+        """Marks the job as running and returns its progress callback."""
+        with self._lock:
+            self._queued -= 1
+        job.status = 'running'
+        job.started_at = time.time()
+
+        def set_stage(stage: str):
+            job.stage = stage
+            job.publish('stage', stage)
+
+        return set_stage
+
+    def _finish(self, job: Job):
+        # Published before finished_at is set so followers never miss it.
+        job.publish(job.status, job.result if job.status == 'completed' else job.error)
+        job.finished_at = time.time()
+        # Finished jobs are kept for status queries; their streamed text is not.
+        job.drop_events('refined')
+
+    def _run(self, job: Job, work):
+        set_stage = self._start(job)
+        try:
+            job.result = work(job, set_stage)
+            job.status = 'completed'
+        except Exception as error:
+            job.error = str(error)
+            job.status = 'failed'
+        finally:
+            self._finish(job)
+
+    async def _run_async(self, job: Job, work):
+        async with self._slots:
+            set_stage = self._start(job)
+            try:
+                job.result = await work(job, set_stage)
+                job.status = 'completed'
+            except Exception as error:
+                job.error = str(error)
+                job.status = 'failed'
+            finally:
+                self._finish(job)
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond max_jobs."""
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None][:max(excess, 0)]:
+            del self._jobs[job_id]
@@ -1,11 +1,39 @@
+import argparse
+import multiprocessing
 import os
-from polyword.services.ocr import OCRService
-from polyword.services.translate import TranslationService
-from polyword.services.storage import StorageService
-from polyword.services.chatgpt import ChatGPTService
-from polyword.processor import PDFProcessor
+import uuid
+from polyword.registry import build_default_registry
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Process PDFs with OCR, translation and refinement.')
+    parser.add_argument('uris', nargs='*',
+                        help='gs:// URIs of PDFs to process as a batch')
+    parser.add_argument('--prefix',
+                        help='gs://bucket/prefix/ to process every PDF under as a batch')
+    parser.add_argument('--max-workers', type=int, default=4,
+                        help='documents processed concurrently in batch mode')
+    parser.add_argument('--languages', nargs='+', default=['en'],
+                        help='target languages; the PDF is OCRed once for all of them')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip stages already completed with the same inputs')
+    parser.add_argument('--run-id',
+                        help='write under results/<run id>; pass an earlier run\'s id with '
+                             '--resume to continue it (default: a new id)')
+    return parser.parse_args()
+
+def list_pdf_uris(storage_service, prefix_uri: str) -> list:
+    bucket_name, prefix = storage_service.parse_gcs_uri(prefix_uri)
+    return [
+        f'gs://{bucket_name}/{blob.name}'
+        for blob in storage_service.list_blobs(bucket_name, prefix)
+        if blob.name.lower().endswith('.pdf')
+    ]
 
 if __name__ == '__main__':
+    # PDF rendering starts worker processes, which must not re-run the CLI.
+    multiprocessing.freeze_support()
+    args = parse_args()
+
     # Set up credentials
     os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'gcpkey.json'
     # Ensure OPENAI_API_KEY is set in your environment
@@ -13,23 +41,35 @@ if __name__ == '__main__':
     input_bucket = 'polyword-bucket'
     output_bucket = 'polyword-bucket'
     pdf_uri = f'gs://{input_bucket}/dzem01.pdf'
-    output_prefix = 'results'
-    target_language = 'en'
+    # Each run writes under its own prefix, like the API and desktop app, so OCR
+    # shards of earlier runs are never read back into this one
+    run_id = args.run_id or uuid.uuid4().hex
+    output_prefix = f'results/{run_id}'
+    print(f'Run id: {run_id}')
+    target_language = args.languages[0] if len(args.languages) == 1 else args.languages
 
     # Initialize services
-    ocr_service = OCRService()
-    translation_service = TranslationService()
-    storage_service = StorageService()
-    chatgpt_service = ChatGPTService()
-
-    # Run processing
-    processor = PDFProcessor(
-        ocr_service, translation_service, storage_service, chatgpt_service
-    )
-    result = processor.process_pdf(
-        pdf_uri, output_bucket, output_prefix, target_language
-    )
-
-    print('Process completed. Results:')
-    for key, uri in result.items():
-        print(f"{key}: {uri}")
\ No newline at end of file
+    services = build_default_registry()
+    processor = services.get('processor')
+
+    if args.uris or args.prefix:
+        pdf_uris = list(args.uris)
+        if args.prefix:
+            pdf_uris += list_pdf_uris(services.get('storage'), args.prefix)
+        results = processor.process_batch(
+            pdf_uris, output_bucket, output_prefix, target_language,
+            max_workers=args.max_workers
+        )
+        print(f'Batch completed for {len(results)} documents. Results:')
+        for uri, result in results.items():
+            print(uri)
+            for key, value in result.items():
+                print(f"  {key}: {value}")
+    else:
+        result = processor.process_pdf(
+            pdf_uri, output_bucket, output_prefix, target_language, resume=args.resume
+        )
+
+        print('Process completed. Results:')
+        for key, uri in result.items():
+            print(f"{key}: {uri}")
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import threading
+import time
+
+class RunManifest:
+    """
+    Records the completed stages of a pipeline run, with each stage's input
+    content hash and output URI, in {prefix}/manifest.json next to the outputs.
+    A resumed run skips any stage whose recorded input hash still matches.
+    """
+
+    FILE_NAME = 'manifest.json'
+
+    def __init__(self, storage_service, bucket_name: str, prefix: str, stages: dict = None):
+        self.storage = storage_service
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.stages = stages or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, storage_service, bucket_name: str, prefix: str) -> 'RunManifest':
+        """Loads the manifest under the prefix, or returns an empty one."""
+        content = storage_service.load_text(f'gs://{bucket_name}/{prefix}/{cls.FILE_NAME}')
+        stages = json.loads(content).get('stages', {}) if content else {}
+        return cls(storage_service, bucket_name, prefix, stages)
+
+    @staticmethod
+    def hash_inputs(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def completed_output(self, stage: str, input_hash: str):
+        """Returns the output URI of stage if it completed with the same input hash."""
+        with self._lock:
+            entry = self.stages.get(stage)
+        if entry and entry['input_hash'] == input_hash:
+            return entry['output_uri']
+        return None
+
+    def record(self, stage: str, input_hash: str, output_uri: str):
+        """Marks stage as completed and writes the manifest to GCS."""
+        with self._lock:
+            self.stages[stage] = {
+                'input_hash': input_hash,
+                'output_uri': output_uri,
+                'completed_at': time.time(),
+            }
+            content = json.dumps({'stages': self.stages}, indent=2)
+            self.storage.save_text(self.bucket_name, f'{self.prefix}/{self.FILE_NAME}', content)
@@ -0,0 +1,124 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+METRIC_HELP = {
+    'polyword_stage_seconds': 'Latency of each pipeline stage.',
+    'polyword_api_call_seconds': 'Latency of calls to external services.',
+    'polyword_api_calls_total': 'Calls to external services.',
+    'polyword_api_errors_total': 'Failed calls to external services.',
+    'polyword_api_retries_total': 'Calls retried after throttling or a transient failure.',
+    'polyword_bytes_transferred_total': 'Bytes uploaded to and downloaded from GCS.',
+    'polyword_characters_translated_total': 'Characters sent for translation.',
+    'polyword_characters_saved_total': 'Characters not sent for translation, by reason.',
+    'polyword_openai_tokens_total': 'OpenAI prompt and completion tokens.',
+}
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process counters and histograms, rendered in the Prometheus
+    text format. Hooks receive every update, so metrics can also be forwarded
+    to another backend (StatsD, OpenTelemetry, logs) without touching callers.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Registers hook(kind, name, value, labels), called on every update."""
+        self._hooks.append(hook)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for hook in self._hooks:
+            hook('counter', name, value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+        for hook in self._hooks:
+            hook('histogram', name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observes the duration of the block in the named histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def track_call(self, service: str, operation: str):
+        """Counts, times and error-counts a call to an external service."""
+        self.inc('polyword_api_calls_total', service=service, operation=operation)
+        try:
+            with self.timer('polyword_api_call_seconds', service=service, operation=operation):
+                yield
+        except Exception:
+            self.inc('polyword_api_errors_total', service=service, operation=operation)
+            raise
+
+    def render_prometheus(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+                for key, value in self._histograms.items()
+            }
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.extend(self._header(name, 'counter'))
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+        for name in sorted({name for name, _ in histograms}):
+            lines.extend(self._header(name, 'histogram'))
+            for (metric, labels), value in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, value['buckets']):
+                    bucket_labels = labels + (('le', str(bound)),)
+                    lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {count}')
+                inf_labels = labels + (('le', '+Inf'),)
+                lines.append(f'{name}_bucket{_format_labels(inf_labels)} {value["count"]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value["sum"]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, name: str, kind: str) -> list:
+        lines = []
+        if name in METRIC_HELP:
+            lines.append(f'# HELP {name} {METRIC_HELP[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+        return lines
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+# Process-wide registry used by the services unless another one is injected.
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,68 @@
+import queue
+import threading
+
+_DONE = object()
+
+def run_pipeline(source, stages: list, queue_size: int = 2) -> dict:
+    """
+    Runs items through a chain of stages, one thread per stage, connected by
+    bounded queues so a slow stage applies backpressure instead of buffering
+    the whole document.
+
+    `source` yields (key, item) pairs where item is a dict; each stage is a
+    (name, func) pair and stores func(item) under item[name]. Returns a dict of
+    key -> item once every item has passed the last stage. The first error
+    raised by the source or any stage is re-raised after the stages drain.
+    """
+    failed = threading.Event()
+    errors = []
+    results = {}
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    def worker(name, func, inbox, outbox):
+        while True:
+            entry = inbox.get()
+            if entry is _DONE:
+                break
+            if failed.is_set():
+                # Keep draining so upstream stages never block on a full queue.
+                continue
+            key, item = entry
+            try:
+                item[name] = func(item)
+            except Exception as error:
+                errors.append(error)
+                failed.set()
+                continue
+            if outbox is None:
+                results[key] = item
+            else:
+                outbox.put(entry)
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    threads = []
+    for index, (name, func) in enumerate(stages):
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+        thread = threading.Thread(
+            target=worker, args=(name, func, queues[index], outbox), daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+
+    try:
+        for entry in source:
+            if failed.is_set():
+                break
+            queues[0].put(entry)
+    except Exception as error:
+        errors.append(error)
+        failed.set()
+    finally:
+        queues[0].put(_DONE)
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
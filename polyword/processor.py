@@ -1,10 +1,21 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Union
 from polyword.services.ocr import OCRService
 from polyword.services.translate import TranslationService
 from polyword.services.storage import StorageService
 from polyword.services.chatgpt import ChatGPTService
-from markdown_pdf import MarkdownPdf, Section
-import tempfile
-import os
+from polyword.services.textlayer import TextLayerService
+from polyword.services.dedup import DeduplicationService
+from polyword.pipeline import run_pipeline
+from polyword.manifest import RunManifest
+from polyword.metrics import MetricsRegistry, REGISTRY
 
 class PDFProcessor:
     def __init__(
@@ -12,91 +23,568 @@ class PDFProcessor:
         ocr_service: OCRService,
         translation_service: TranslationService,
         storage_service: StorageService,
-        chatgpt_service: ChatGPTService
+        chatgpt_service: ChatGPTService,
+        pipeline_queue_size: int = 2,
+        text_layer_service: TextLayerService = None,
+        metrics: MetricsRegistry = None,
+        render_executor: Executor = None,
+        render_workers: int = None,
+        deduplication_service: DeduplicationService = None
     ):
         self.ocr = ocr_service
         self.translator = translation_service
         self.storage = storage_service
         self.chatgpt = chatgpt_service
+        self.pipeline_queue_size = pipeline_queue_size
+        self.text_layer = text_layer_service
+        self.dedup = deduplication_service
+        self.metrics = metrics or REGISTRY
+        # Rendering is CPU-bound, so it runs in worker processes; any Executor
+        # (e.g. a ThreadPoolExecutor in tests) can be injected instead.
+        self.render_workers = render_workers
+        self._render_executor = render_executor
+        self._render_lock = threading.Lock()
 
     def process_pdf(
         self,
         pdf_uri: str,
         output_bucket: str,
         output_prefix: str,
-        target_language: str
+        target_language: Union[str, list],
+        batch_translation: bool = True,
+        chunked_refinement: bool = True,
+        pipelined: bool = False,
+        progress_callback: Callable[[str], None] = None,
+        resume: bool = False,
+        on_refined_text: Callable[[str, str], None] = None
     ) -> dict:
-        # Step 1: OCR
-        json_output_uri = f'gs://{output_bucket}/{output_prefix}/'
-        self.ocr.async_detect_document(pdf_uri, json_output_uri)
-
-        # Step 2: Extract text
-        extracted_text = self.ocr.extract_text_from_results(
-            self.storage, output_bucket, output_prefix
-        )
-        original_uri = self.storage.save_text(
-            output_bucket,
-            f"{output_prefix}/original_text.txt",
-            extracted_text
+        """
+        Runs OCR, translation, refinement and PDF rendering for a PDF in GCS.
+        target_language may be a list: the PDF is then OCRed once and translated,
+        refined and rendered into every language in parallel, and the result has
+        per-language keys such as 'translated_text_de_uri' and 'refined_pdf_de_uri'.
+        progress_callback, if given, is called with the name of each stage as it starts.
+        on_refined_text, if given, is called with (language, text) for each piece of
+        refined markdown as it is generated (not in pipelined mode).
+        Completed stages are recorded in {output_prefix}/manifest.json; with resume,
+        stages whose inputs are unchanged since the last run are skipped.
+        The result includes a 'timings' breakdown in seconds per stage. With a
+        deduplication service and batch_translation, repeated segments are
+        translated once and the result includes 'characters_saved' per language.
+        Except in pipelined mode this runs process_pdf_async to completion, so it
+        must not be called from a running event loop. Pipelined mode always OCRs
+        every page (the text layer service is not used) and does not support
+        resume or on_refined_text.
+        PDFs are rendered in spawn-started worker processes, which re-import the
+        calling script's __main__ module: scripts must call this under an
+        `if __name__ == '__main__':` guard, and frozen executables must call
+        multiprocessing.freeze_support() first thing in that block.
+        """
+        if pipelined and (resume or on_refined_text):
+            raise ValueError('resume and on_refined_text are not supported in pipelined mode')
+        if not pipelined:
+            return self._run(self.process_pdf_async(
+                pdf_uri, output_bucket, output_prefix, target_language,
+                batch_translation, chunked_refinement, progress_callback, resume,
+                on_refined_text
+            ))
+        timings = {}
+        stage = self._stage_tracker(progress_callback, timings)
+        start = time.perf_counter()
+        result = self._process_pipelined(
+            pdf_uri, output_bucket, output_prefix, target_language,
+            batch_translation, chunked_refinement, stage
         )
+        timings['total'] = time.perf_counter() - start
+        result['timings'] = timings
+        return result
 
-        # Step 3: Translate
-        translated_text = self.translator.translate_text(
-            extracted_text, target_language
-        )
-        translated_uri = self.storage.save_text(
-            output_bucket,
-            f"{output_prefix}/translated_text_{target_language}.txt",
-            translated_text
-        )
+    async def process_pdf_async(
+        self,
+        pdf_uri: str,
+        output_bucket: str,
+        output_prefix: str,
+        target_language: Union[str, list],
+        batch_translation: bool = True,
+        chunked_refinement: bool = True,
+        progress_callback: Callable[[str], None] = None,
+        resume: bool = False,
+        on_refined_text: Callable[[str, str], None] = None
+    ) -> dict:
+        """
+        Async version of process_pdf (without pipelined mode). Blocking SDK calls
+        run in threads and rendering in the render pool, so one event loop can
+        process many documents concurrently.
+        """
+        timings = {}
+        stage = self._stage_tracker(progress_callback, timings)
+        start = time.perf_counter()
+        if resume:
+            manifest = await asyncio.to_thread(
+                RunManifest.load, self.storage, output_bucket, output_prefix
+            )
+        else:
+            manifest = RunManifest(self.storage, output_bucket, output_prefix)
 
-        # Step 4: Refine
-        refined_text = self.chatgpt.refine_text(translated_text)
-        refined_uri = self.storage.save_text(
-            output_bucket,
-            f"{output_prefix}/refined_text_{target_language}.txt",
-            refined_text
+        # Step 1 & 2: OCR and extract text
+        extract_hash = await asyncio.to_thread(self._extract_hash, pdf_uri, bool(self.text_layer))
+        extracted_text = await self._resume(manifest, 'extract', extract_hash)
+        if extracted_text is None:
+            with stage('ocr'):
+                if self.text_layer:
+                    extracted_text = await self._extract_with_text_layer(
+                        pdf_uri, output_bucket, output_prefix
+                    )
+                else:
+                    json_output_uri = f'gs://{output_bucket}/{output_prefix}/'
+                    await self.ocr.detect_document_async(pdf_uri, json_output_uri)
+                    extracted_text = await asyncio.to_thread(
+                        self.ocr.extract_text_from_results, self.storage, output_bucket, output_prefix
+                    )
+        result = await self._process_extracted(
+            extracted_text, extract_hash, manifest, output_bucket, output_prefix,
+            target_language, batch_translation, chunked_refinement, stage,
+            on_refined_text=on_refined_text
         )
+        timings['total'] = time.perf_counter() - start
+        result['timings'] = timings
+        return result
+
+    def process_batch(
+        self,
+        pdf_uris: list,
+        output_bucket: str,
+        output_prefix: str,
+        target_language: Union[str, list],
+        max_workers: int = 4
+    ) -> dict:
+        """
+        Processes many PDFs: OCR is submitted for all of them in as few batch
+        requests as possible, and each document is handed to a bounded worker pool
+        for extraction, translation and refinement as soon as its OCR completes.
+        Each document writes under {output_prefix}/{blob name without .pdf}.
+        Returns {pdf_uri: result dict or {'error': message}}.
+        """
+        prefixes = {}
+        documents = []
+        for pdf_uri in pdf_uris:
+            _, blob_name = self.storage.parse_gcs_uri(pdf_uri)
+            prefixes[pdf_uri] = f"{output_prefix}/{os.path.splitext(blob_name)[0]}"
+            documents.append((pdf_uri, f'gs://{output_bucket}/{prefixes[pdf_uri]}/'))
+
+        def process_document(pdf_uri):
+            timings = {}
+            stage = self._stage_tracker(None, timings)
+            with stage('extract'):
+                extracted_text = self.ocr.extract_text_from_results(
+                    self.storage, output_bucket, prefixes[pdf_uri]
+                )
+            manifest = RunManifest(self.storage, output_bucket, prefixes[pdf_uri])
+            result = self._run(self._process_extracted(
+                extracted_text, self._extract_hash(pdf_uri, False), manifest,
+                output_bucket, prefixes[pdf_uri], target_language, True, True, stage
+            ))
+            result['timings'] = timings
+            return result
+
+        results = {}
+        futures = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for completed, error in self.ocr.poll_operations(self.ocr.submit_documents(documents)):
+                for pdf_uri, _ in completed:
+                    if error:
+                        results[pdf_uri] = {'error': str(error)}
+                    else:
+                        futures[pdf_uri] = executor.submit(process_document, pdf_uri)
+            for pdf_uri, future in futures.items():
+                try:
+                    results[pdf_uri] = future.result()
+                except Exception as error:
+                    results[pdf_uri] = {'error': str(error)}
+        return results
+
+    async def _process_extracted(
+        self,
+        extracted_text: str,
+        extract_hash: str,
+        manifest: RunManifest,
+        output_bucket: str,
+        output_prefix: str,
+        target_language: Union[str, list],
+        batch_translation: bool,
+        chunked_refinement: bool,
+        stage: Callable,
+        translated_texts: dict = None,
+        refined_texts: dict = None,
+        on_refined_text: Callable[[str, str], None] = None
+    ) -> dict:
+        """
+        Saves the extracted text once, then translates, refines and renders it into
+        each target language as parallel branches. Precomputed {language: text}
+        translations and refinements are saved as-is. With several languages the
+        branch stages are named e.g. 'translate_de' and the result keys e.g.
+        'refined_text_de_uri'.
+        """
+        single = isinstance(target_language, str)
+        languages = self._languages(target_language)
+        saved = {}
+        segments = None
+
+        def segment():
+            # Deduplicated once for all languages, and only if one is translated.
+            nonlocal segments
+            if segments is None:
+                async def run():
+                    with stage('dedup'):
+                        return await self.dedup.segment_async(extracted_text)
+                segments = asyncio.create_task(run())
+            return segments
+
+        use_dedup = bool(self.dedup) and batch_translation
+        original = asyncio.create_task(self._checkpoint(
+            manifest, 'extract', extract_hash, f"{output_prefix}/original_text.txt", extracted_text
+        ))
+        branches = await asyncio.gather(*(
+            self._process_language(
+                extracted_text, manifest, output_bucket, output_prefix, language,
+                batch_translation, chunked_refinement,
+                stage if single else (lambda name, language=language: stage(f'{name}_{language}')),
+                (translated_texts or {}).get(language), (refined_texts or {}).get(language),
+                (lambda text, language=language: on_refined_text(language, text))
+                if on_refined_text else None,
+                segment if use_dedup else None, saved
+            )
+            for language in languages
+        ), return_exceptions=True)
+        # Every branch has finished (and saved what it could) before any error is raised.
+        result = {'original_text_uri': await original}
+        for branch in branches:
+            if isinstance(branch, BaseException):
+                raise branch
+        if single:
+            result.update(branches[0])
+        else:
+            for language, branch in zip(languages, branches):
+                for key, uri in branch.items():
+                    result[key.replace('_uri', f'_{language}_uri')] = uri
+        if saved:
+            result['characters_saved'] = saved
+        return result
+
+    async def _process_language(
+        self,
+        extracted_text: str,
+        manifest: RunManifest,
+        output_bucket: str,
+        output_prefix: str,
+        target_language: str,
+        batch_translation: bool,
+        chunked_refinement: bool,
+        stage: Callable,
+        translated_text: str = None,
+        refined_text: str = None,
+        on_refined_text: Callable[[str], None] = None,
+        segments: Callable = None,
+        saved: dict = None
+    ) -> dict:
+        """
+        Translates, refines and renders extracted text into one language. Each stage
+        output is saved in the background while the next stage runs and recorded in
+        the manifest once written. With on_refined_text the refinement is streamed
+        to it; a resumed refined text is passed to it whole. segments, if given,
+        returns a task for the deduplicated extracted text; only its unique segments
+        are translated and the characters saved are stored in saved[target_language].
+        """
+        saves = []
+
+        def checkpoint(stage_name: str, input_hash: str, file_name: str, text: str):
+            task = asyncio.create_task(
+                self._checkpoint(manifest, stage_name, input_hash, file_name, text)
+            )
+            saves.append(task)
+            return task
+
+        try:
+            # Step 3: Translate
+            translate_stage = f'translate_{target_language}'
+            translate_hash = RunManifest.hash_inputs(
+                extracted_text, target_language, str(batch_translation),
+                *(['dedup', str(self.dedup.detect_language)] if segments else [])
+            )
+            if translated_text is None:
+                translated_text = await self._resume(manifest, translate_stage, translate_hash)
+            if translated_text is None:
+                if segments:
+                    document = await segments()
+                    with stage('translate'):
+                        translated_text, saved[target_language] = await self.dedup.translate_async(
+                            document, target_language
+                        )
+                else:
+                    with stage('translate'):
+                        translated_text = await self._translate_async(
+                            extracted_text, target_language, batch_translation
+                        )
+            translated = checkpoint(
+                translate_stage, translate_hash,
+                f"{output_prefix}/translated_text_{target_language}.txt", translated_text
+            )
+
+            # Step 4: Refine
+            refine_stage = f'refine_{target_language}'
+            refine_hash = RunManifest.hash_inputs(
+                translated_text, self.chatgpt.model, str(chunked_refinement)
+            )
+            if refined_text is None:
+                refined_text = await self._resume(manifest, refine_stage, refine_hash)
+                if refined_text is not None and on_refined_text:
+                    on_refined_text(refined_text)
+            if refined_text is None:
+                with stage('refine'):
+                    refined_text = await self._refine_async(
+                        translated_text, chunked_refinement, on_refined_text
+                    )
+            refined = checkpoint(
+                refine_stage, refine_hash,
+                f"{output_prefix}/refined_text_{target_language}.txt", refined_text
+            )
+
+            # Step 5: Convert refined text to PDF while the text saves finish
+            render_stage = f'render_{target_language}'
+            render_hash = RunManifest.hash_inputs(refined_text)
+            pdf_uri = manifest.completed_output(render_stage, render_hash)
+            if pdf_uri is None:
+                with stage('render'):
+                    pdf_uri = await self._convert_to_pdf(
+                        refined_text,
+                        output_bucket,
+                        f"{output_prefix}/refined_text_{target_language}.pdf"
+                    )
+                await asyncio.to_thread(manifest.record, render_stage, render_hash, pdf_uri)
+
+            with stage('save'):
+                return {
+                    'translated_text_uri': await translated,
+                    'refined_text_uri': await refined,
+                    'refined_pdf_uri': pdf_uri
+                }
+        finally:
+            # Let started saves finish and be recorded even if a later stage failed.
+            if saves:
+                await asyncio.wait(saves)
+
+    def _run(self, coroutine):
+        """
+        Runs a coroutine on a new event loop, closing the OpenAI client created
+        for that loop (and its connection pool) before the loop goes away.
+        """
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await self.chatgpt.close_async_client()
+
+        return asyncio.run(run())
 
-        # Step 5: Convert refined text to PDF
-        pdf_uri = self._convert_to_pdf(
-            refined_text,
-            output_bucket,
-            f"{output_prefix}/refined_text_{target_language}.pdf"
+    @staticmethod
+    def _languages(target_language: Union[str, list]) -> list:
+        """Returns the target languages as a list without duplicates."""
+        if isinstance(target_language, str):
+            return [target_language]
+        languages = list(dict.fromkeys(target_language))
+        if not languages:
+            raise ValueError('At least one target language is required')
+        return languages
+
+    def _stage_tracker(self, progress_callback: Callable[[str], None], timings: dict) -> Callable:
+        """
+        Returns stage(name), a context manager that reports the stage to
+        progress_callback, adds its duration to timings and to the
+        polyword_stage_seconds histogram.
+        """
+        @contextmanager
+        def stage(name: str):
+            if progress_callback:
+                progress_callback(name)
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                elapsed = time.perf_counter() - start
+                timings[name] = timings.get(name, 0) + elapsed
+                self.metrics.observe('polyword_stage_seconds', elapsed, stage=name)
+
+        return stage
+
+    async def _checkpoint(self, manifest: RunManifest, stage: str, input_hash: str,
+                          file_name: str, text: str) -> str:
+        """
+        Saves a stage output and records it in the manifest, returning its GCS URI.
+        Outputs already recorded with the same input hash are not written again.
+        """
+        uri = manifest.completed_output(stage, input_hash)
+        if uri is None:
+            uri = await self.storage.save_text_async(manifest.bucket_name, file_name, text)
+            await asyncio.to_thread(manifest.record, stage, input_hash, uri)
+        return uri
+
+    async def _resume(self, manifest: RunManifest, stage: str, input_hash: str):
+        """Returns the saved output of a stage completed with the same inputs, or None."""
+        uri = manifest.completed_output(stage, input_hash)
+        return await self.storage.load_text_async(uri) if uri else None
+
+    def _extract_hash(self, pdf_uri: str, use_text_layer: bool) -> str:
+        return RunManifest.hash_inputs(
+            self.storage.content_hash(pdf_uri), 'text_layer' if use_text_layer else 'ocr'
         )
 
-        return {
-            'original_text_uri': original_uri,
-            'translated_text_uri': translated_uri,
-            'refined_text_uri': refined_uri,
-            'refined_pdf_uri': pdf_uri
-        }
-
-    def _convert_to_pdf(self, markdown_text: str, bucket_name: str, dest_blob_name: str) -> str:
-        """Convert markdown text to PDF and upload to GCS."""
-        # Create a temporary file for the PDF
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            # Initialize PDF converter
-            pdf = MarkdownPdf(toc_level=2, optimize=True)
-            
-            # Add metadata
-            pdf.meta["title"] = "Refined Document"
-            pdf.meta["author"] = "PolyWord"
-            
-            # Add the markdown content as a section
-            pdf.add_section(Section(markdown_text))
-            
-            # Save to temporary file
-            pdf.save(temp_pdf.name)
-            
-            # Upload to GCS
-            gcs_uri = self.storage.upload_pdf_to_gcs(
-                temp_pdf.name,
-                bucket_name,
-                dest_blob_name
+    def _process_pipelined(
+        self,
+        pdf_uri: str,
+        output_bucket: str,
+        output_prefix: str,
+        target_language: Union[str, list],
+        batch_translation: bool,
+        chunked_refinement: bool,
+        stage: Callable
+    ) -> dict:
+        """
+        Streams each OCR output shard through extract, translate and refine stages
+        as soon as it is written, with bounded queues between the stages, and
+        assembles the outputs in page order at the end.
+        """
+        json_output_uri = f'gs://{output_bucket}/{output_prefix}/'
+        languages = self._languages(target_language)
+        stages = [
+            ('original', lambda shard: self.ocr.extract_text_from_shard(self.storage, shard['blob'])),
+        ]
+        for language in languages:
+            stages += [
+                (f'translated_{language}', lambda shard, language=language: self._translate(
+                    shard['original'], language, batch_translation
+                )),
+                (f'refined_{language}', lambda shard, language=language: self._refine(
+                    shard[f'translated_{language}'], chunked_refinement
+                )),
+            ]
+        with stage('pipeline'):
+            operation = self.ocr.start_detect_document(pdf_uri, json_output_uri)
+            source = (
+                (first_page, {'blob': blob})
+                for first_page, blob in self.ocr.iter_result_shards(
+                    self.storage, output_bucket, output_prefix, operation
+                )
+            )
+            shards = run_pipeline(source, stages, self.pipeline_queue_size)
+        ordered = [shards[key] for key in sorted(shards)]
+        extracted_text = ''.join(shard['original'] for shard in ordered)
+        translated_texts = {}
+        refined_texts = {}
+        for language in languages:
+            translated_texts[language] = '\n\n'.join(
+                shard[f'translated_{language}'] for shard in ordered
+                if shard[f'translated_{language}']
+            )
+            refined_texts[language] = '\n\n'.join(
+                shard[f'refined_{language}'] for shard in ordered if shard[f'refined_{language}']
+            )
+
+        return self._run(self._process_extracted(
+            extracted_text, self._extract_hash(pdf_uri, False),
+            RunManifest(self.storage, output_bucket, output_prefix),
+            output_bucket, output_prefix, target_language,
+            batch_translation, chunked_refinement, stage,
+            translated_texts=translated_texts, refined_texts=refined_texts
+        ))
+
+    async def _extract_with_text_layer(self, pdf_uri: str, output_bucket: str,
+                                       output_prefix: str) -> str:
+        """
+        Uses the embedded text layer for born-digital pages and sends only the
+        scanned pages to Vision OCR as a reduced PDF, merging results in page order.
+        """
+        pdf_bytes = await self.storage.download_bytes_async(pdf_uri)
+        pages, scanned_pages = await asyncio.to_thread(self.text_layer.classify_pages, pdf_bytes)
+        if scanned_pages:
+            subset_pdf = await asyncio.to_thread(
+                self.text_layer.build_subset_pdf, pdf_bytes, scanned_pages
+            )
+            subset_uri = await self.storage.upload_bytes_async(
+                output_bucket, f"{output_prefix}/scanned_pages.pdf", subset_pdf, 'application/pdf'
+            )
+            await self.ocr.detect_document_async(subset_uri, f'gs://{output_bucket}/{output_prefix}/')
+            ocr_pages = await asyncio.to_thread(
+                lambda: list(self.ocr.iter_pages(self.storage, output_bucket, output_prefix))
             )
-            
-            # Clean up temporary file
-            os.unlink(temp_pdf.name)
-            
-            return gcs_uri
\ No newline at end of file
+            for subset_page, text in ocr_pages:
+                pages[scanned_pages[subset_page - 1]] = text
+        return ''.join(pages[page_number] + '\n\n' for page_number in sorted(pages))
+
+    def _translate(self, text: str, target_language: str, batch_translation: bool) -> str:
+        if batch_translation:
+            return self.translator.translate_batch(text, target_language)
+        return self.translator.translate_text(text, target_language)
+
+    def _refine(self, text: str, chunked_refinement: bool) -> str:
+        if chunked_refinement:
+            return self.chatgpt.refine_chunked(text)
+        return self.chatgpt.refine_text(text)
+
+    async def _translate_async(self, text: str, target_language: str,
+                               batch_translation: bool) -> str:
+        if batch_translation:
+            return await self.translator.translate_batch_async(text, target_language)
+        return await self.translator.translate_text_async(text, target_language)
+
+    async def _refine_async(self, text: str, chunked_refinement: bool,
+                            on_text: Callable[[str], None] = None) -> str:
+        if on_text:
+            if chunked_refinement:
+                pieces = self.chatgpt.refine_chunked_stream(text)
+            else:
+                pieces = self.chatgpt.refine_text_stream(text)
+            parts = []
+            async for piece in pieces:
+                on_text(piece)
+                parts.append(piece)
+            return ''.join(parts)
+        if chunked_refinement:
+            return await self.chatgpt.refine_chunked_async(text)
+        return await self.chatgpt.refine_text_async(text)
+
+    @property
+    def render_executor(self) -> Executor:
+        """Process pool for PDF rendering, started on first use."""
+        with self._render_lock:
+            if self._render_executor is None:
+                # spawn rather than fork: the parent has live threads and SDK clients
+                self._render_executor = ProcessPoolExecutor(
+                    max_workers=self.render_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._render_executor
+
+    async def _convert_to_pdf(self, markdown_text: str, bucket_name: str,
+                              dest_blob_name: str) -> str:
+        """Renders markdown to PDF in the render pool and uploads it to GCS from memory."""
+        loop = asyncio.get_running_loop()
+        pdf_bytes = await loop.run_in_executor(
+            self.render_executor, render_markdown_pdf, markdown_text
+        )
+        return await self.storage.upload_bytes_async(
+            bucket_name, dest_blob_name, pdf_bytes, 'application/pdf'
+        )
+
+def render_markdown_pdf(markdown_text: str) -> bytes:
+    """Renders markdown to PDF bytes. Runs in a render worker process."""
+    from markdown_pdf import MarkdownPdf, Section
+    pdf = MarkdownPdf(toc_level=2, optimize=True)
+    pdf.meta["title"] = "Refined Document"
+    pdf.meta["author"] = "PolyWord"
+    pdf.add_section(Section(markdown_text))
+    buffer = io.BytesIO()
+    # MarkdownPdf.save hands its target to PyMuPDF's ez_save, which also
+    # writes to file objects; save_bytes only exists in later markdown-pdf
+    # releases and skips the optimize=True compression.
+    pdf.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,253 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from polyword.metrics import MetricsRegistry, REGISTRY
+
+THROTTLE_STATUS_CODES = {429}
+TRANSIENT_STATUS_CODES = {408, 500, 502, 503, 504}
+# Matched by name so the SDKs do not have to be imported to classify their errors.
+TRANSIENT_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError'}
+
+class TokenBucket:
+    """Allows rate units per second on average, with bursts of up to capacity units."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self, amount: float, now: float) -> float:
+        """Returns the seconds until amount units are available (0 if they are now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single request larger than the bucket only has to wait for a full bucket.
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+class RateLimiter:
+    """
+    Shared gate for calls to one external API. Callers are admitted within a
+    requests-per-second and a units-per-minute budget (characters, tokens),
+    and up to an adaptive concurrency limit that halves when the API throttles
+    and grows back by about one slot per limit successful calls. Throttled
+    calls admitted before the last decrease were sent under the old limit, so
+    a burst of them halves the limit only once. Throttled and
+    transient failures are retried with jittered exponential backoff, waiting
+    at least as long as the API's Retry-After; a Retry-After also holds back
+    every other caller of the limiter.
+    """
+
+    ASYNC_POLL_INTERVAL = 0.05
+
+    def __init__(self, name: str, requests_per_second: float = None,
+                 units_per_minute: float = None, max_concurrency: int = 16,
+                 min_concurrency: int = 1, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0, metrics: MetricsRegistry = None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics or REGISTRY
+        self._requests = (
+            TokenBucket(requests_per_second, max(requests_per_second, 1))
+            if requests_per_second else None
+        )
+        self._units = TokenBucket(units_per_minute / 60, units_per_minute) if units_per_minute else None
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._decreased_at = float('-inf')
+        self._random = random.Random()
+        self._condition = threading.Condition()
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._limit)
+
+    def call(self, func, *args, units: float = 0, **kwargs):
+        """Calls func(*args, **kwargs) within the limits, retrying retryable failures."""
+        attempt = 0
+        while True:
+            with self._condition:
+                while (wait := self._try_acquire(units)) != 0:
+                    self._condition.wait(wait)
+            admitted = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as error:
+                attempt += 1
+                delay = self._failed(error, attempt, admitted)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                # Cancellation or interruption: free the slot before propagating.
+                self._release('error', admitted)
+                raise
+            else:
+                self._release(None, admitted)
+                return result
+
+    async def call_async(self, func, *args, units: float = 0, **kwargs):
+        """Same as call for a coroutine function, waiting without blocking the event loop."""
+        attempt = 0
+        while True:
+            admitted = await self._acquire_async(units)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as error:
+                attempt += 1
+                delay = self._failed(error, attempt, admitted)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancellation or interruption: free the slot before propagating.
+                self._release('error', admitted)
+                raise
+            else:
+                self._release(None, admitted)
+                return result
+
+    async def stream_async(self, func, *args, units: float = 0, **kwargs):
+        """
+        Same as call_async for an async generator function: yields the items of
+        func(*args, **kwargs), holding the call's slot until the stream is fully
+        consumed. Failures before the first item are retried; a failure part-way
+        through still adapts the limit but is raised, as items were already yielded.
+        """
+        attempt = 0
+        while True:
+            admitted = await self._acquire_async(units)
+            started = False
+            try:
+                async for item in func(*args, **kwargs):
+                    started = True
+                    yield item
+            except Exception as error:
+                attempt += 1
+                delay = self._failed(error, attempt, admitted, retry=not started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancellation, or the consumer closed the stream early.
+                self._release('error', admitted)
+                raise
+            else:
+                self._release(None, admitted)
+                return
+
+    async def _acquire_async(self, units: float) -> float:
+        """Waits for a slot without blocking the event loop; returns the admission time."""
+        while True:
+            with self._condition:
+                wait = self._try_acquire(units)
+            if wait == 0:
+                return time.monotonic()
+            # Releases only notify threads, so async callers poll for a free slot.
+            await asyncio.sleep(wait if wait is not None else self.ASYNC_POLL_INTERVAL)
+
+    def _try_acquire(self, units: float):
+        """
+        Admits a call if the limits allow it and returns 0. Otherwise returns the
+        seconds until the budgets allow it, or None if all slots are taken.
+        Must be called with the condition held.
+        """
+        if self._in_flight >= int(self._limit):
+            return None
+        now = time.monotonic()
+        wait = max(
+            self._paused_until - now,
+            self._requests.delay(1, now) if self._requests else 0,
+            self._units.delay(units, now) if self._units else 0,
+        )
+        if wait > 0:
+            return wait
+        if self._requests:
+            self._requests.take(1)
+        if self._units:
+            self._units.take(units)
+        self._in_flight += 1
+        return 0
+
+    def _failed(self, error: Exception, attempt: int, admitted: float, retry: bool = True):
+        """
+        Releases a failed call and returns the delay before retrying it, or None
+        if it is not retried.
+        """
+        reason = self.classify(error)
+        retry_after = self.retry_after(error) if reason else None
+        # Errors that are not retryable (bad requests, auth) leave the limit as is.
+        self._release(reason or 'error', admitted, retry_after)
+        if not retry or reason is None or attempt > self.max_retries:
+            return None
+        self.metrics.inc('polyword_api_retries_total', service=self.name, reason=reason)
+        backoff = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0)
+
+    def _release(self, failure: str, admitted: float, retry_after: float = None):
+        """
+        Frees a call's slot and adapts the limit: None is a success, 'throttled'
+        and 'transient' are retryable failures and 'error' any other failure.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if failure == 'throttled':
+                if admitted >= self._decreased_at:
+                    self._limit = max(self.min_concurrency, self._limit / 2)
+                    self._decreased_at = now
+            elif failure is None:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._condition.notify_all()
+
+    @staticmethod
+    def classify(error: Exception):
+        """Returns 'throttled' or 'transient' for retryable errors, None otherwise."""
+        # OpenAI errors carry status_code, google.api_core errors carry code.
+        status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+        if status in THROTTLE_STATUS_CODES:
+            return 'throttled'
+        # Translate v2 reports exceeded quotas as 403 rateLimitExceeded.
+        if status == 403 and 'ratelimitexceeded' in str(error).lower():
+            return 'throttled'
+        if status in TRANSIENT_STATUS_CODES:
+            return 'transient'
+        if isinstance(error, (ConnectionError, TimeoutError)) \
+                or type(error).__name__ in TRANSIENT_ERROR_NAMES:
+            return 'transient'
+        return None
+
+    @staticmethod
+    def retry_after(error: Exception):
+        """Returns the Retry-After of the error's HTTP response in seconds, if any."""
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if not headers:
+            return None
+        if headers.get('retry-after-ms'):
+            try:
+                return float(headers['retry-after-ms']) / 1000
+            except ValueError:
+                pass
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,113 @@
+import os
+import threading
+from typing import Callable
+
+class ServiceRegistry:
+    """
+    Builds services on first use from registered factories, so entry points
+    only pay for (and import) the backends a code path actually touches.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], object]):
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        """Returns the named service, building it on first access."""
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+def _env_float(name: str):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+def build_default_registry(cache_path: str = 'polyword_cache.sqlite3',
+                           text_layer: bool = True, dedup: bool = True,
+                           detect_language: bool = False) -> ServiceRegistry:
+    """
+    Registers the PolyWord services: 'cache', 'ocr', 'translation', 'dedup',
+    'storage', 'chatgpt', 'text_layer' and 'processor', plus the 'translate_limiter' and
+    'openai_limiter' rate limiters shared by every caller of those APIs. Their
+    budgets come from POLYWORD_TRANSLATE_RPS, POLYWORD_TRANSLATE_CHARS_PER_MINUTE,
+    POLYWORD_OPENAI_RPS and POLYWORD_OPENAI_TOKENS_PER_MINUTE (unset means
+    unlimited). Service modules are imported inside the factories and SDK
+    clients are created by the services on first use.
+    """
+    registry = ServiceRegistry()
+
+    def translate_limiter():
+        from polyword.ratelimit import RateLimiter
+        return RateLimiter(
+            'translate',
+            requests_per_second=_env_float('POLYWORD_TRANSLATE_RPS'),
+            units_per_minute=_env_float('POLYWORD_TRANSLATE_CHARS_PER_MINUTE')
+        )
+
+    def openai_limiter():
+        from polyword.ratelimit import RateLimiter
+        return RateLimiter(
+            'openai',
+            requests_per_second=_env_float('POLYWORD_OPENAI_RPS'),
+            units_per_minute=_env_float('POLYWORD_OPENAI_TOKENS_PER_MINUTE')
+        )
+
+    def cache():
+        from polyword.services.cache import ResultCache
+        return ResultCache(cache_path)
+
+    def ocr():
+        from polyword.services.ocr import OCRService
+        return OCRService()
+
+    def translation():
+        from polyword.services.translate import TranslationService
+        return TranslationService(
+            cache=registry.get('cache'), rate_limiter=registry.get('translate_limiter')
+        )
+
+    def deduplication():
+        from polyword.services.dedup import DeduplicationService
+        return DeduplicationService(registry.get('translation'), detect_language=detect_language)
+
+    def storage():
+        from polyword.services.storage import StorageService
+        return StorageService()
+
+    def chatgpt():
+        from polyword.services.chatgpt import ChatGPTService
+        return ChatGPTService(
+            cache=registry.get('cache'), rate_limiter=registry.get('openai_limiter')
+        )
+
+    def text_layer_service():
+        from polyword.services.textlayer import TextLayerService
+        return TextLayerService()
+
+    def processor():
+        from polyword.processor import PDFProcessor
+        return PDFProcessor(
+            registry.get('ocr'),
+            registry.get('translation'),
+            registry.get('storage'),
+            registry.get('chatgpt'),
+            text_layer_service=registry.get('text_layer') if text_layer else None,
+            deduplication_service=registry.get('dedup') if dedup else None
+        )
+
+    registry.register('translate_limiter', translate_limiter)
+    registry.register('openai_limiter', openai_limiter)
+    registry.register('cache', cache)
+    registry.register('ocr', ocr)
+    registry.register('translation', translation)
+    registry.register('dedup', deduplication)
+    registry.register('storage', storage)
+    registry.register('chatgpt', chatgpt)
+    registry.register('text_layer', text_layer_service)
+    registry.register('processor', processor)
+    return registry
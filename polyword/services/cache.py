@@ -0,0 +1,104 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+class ResultCache:
+    """
+    Persistent content-addressed cache backed by a local SQLite file.
+    Entries are evicted least-recently-used once max_entries is exceeded.
+    """
+
+    def __init__(self, path: str = 'polyword_cache.sqlite3', max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hashes the given parts into a cache key."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached value for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE cache SET accessed_at = ? WHERE key = ?', (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def get_many(self, keys: list) -> dict:
+        """Returns {key: value} for the keys found, in a single transaction."""
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's limit on query parameters.
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                found.update(self._conn.execute(
+                    f'SELECT key, value FROM cache WHERE key IN ({placeholders})', batch
+                ).fetchall())
+            self.hits += sum(key in found for key in keys)
+            self.misses += sum(key not in found for key in keys)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    'UPDATE cache SET accessed_at = ? WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def set(self, key: str, value: str):
+        """Stores value under key and evicts the least recently used entries."""
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        """Stores several values in a single transaction, then evicts as set does."""
+        if not items:
+            return
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, accessed_at) VALUES (?, ?, ?)',
+                [(key, value, now) for key, value in items.items()]
+            )
+            count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    '(SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this cache instance."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
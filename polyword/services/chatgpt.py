@@ -1,9 +1,11 @@
+import asyncio
 import os
-from openai import OpenAI
-
-api_key = ""
-
-client = OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
+import re
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from polyword.metrics import MetricsRegistry, REGISTRY
+from polyword.ratelimit import RateLimiter
 
 class ChatGPTService:
     DEFAULT_SYSTEM_PROMPT = """I want you to edit the following text while following the rules below:
@@ -13,8 +15,74 @@ class ChatGPTService:
     - Format the text as a markdown document
     """
 
-    def __init__(self, api_key: str = None, model: str = 'gpt-4o-mini'):
+    CONTEXT_INSTRUCTIONS = """The text is one part of a longer document. The preceding part is given
+    for context only, between <context> tags. Do not repeat or edit it, only return the edited text.
+    """
+
+    # Rough characters-per-token ratio used to estimate chunk sizes without a tokenizer.
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, api_key: str = None, model: str = 'gpt-4o-mini',
+                 max_chunk_tokens: int = 2000, max_workers: int = 4,
+                 overlap_tokens: int = 0, cache=None, metrics: MetricsRegistry = None,
+                 openai_client=None, rate_limiter: RateLimiter = None,
+                 async_openai_client=None):
+        self.api_key = api_key
+        self._client = openai_client
+        self._async_client = async_openai_client
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
         self.model = model
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_workers = max_workers
+        self.overlap_tokens = overlap_tokens
+        self.cache = cache
+        self.metrics = metrics or REGISTRY
+        # Budgets are in tokens per minute, estimated from the prompt length.
+        self.rate_limiter = rate_limiter or RateLimiter('openai', metrics=self.metrics)
+
+    @property
+    def client(self):
+        """The OpenAI client, created (and the SDK imported) on first use."""
+        if self._client is None:
+            from openai import OpenAI
+            # Retries are left to the rate limiter so they also slow down other callers.
+            self._client = OpenAI(
+                api_key=self.api_key or os.getenv('OPENAI_API_KEY'), max_retries=0
+            )
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        The AsyncOpenAI client used by the *_async methods. Its connection pool
+        belongs to one event loop, and process_pdf runs a loop per call, possibly
+        in several threads at once, so each running loop gets its own client. An
+        injected async_openai_client is used on every loop as given.
+        """
+        if self._async_client is not None:
+            return self._async_client
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(
+                    api_key=self.api_key or os.getenv('OPENAI_API_KEY'), max_retries=0
+                )
+                self._async_clients[loop] = client
+            return client
+
+    async def close_async_client(self):
+        """
+        Closes the running loop's AsyncOpenAI client, if one was created; call it
+        before closing a loop the *_async methods were used on. An injected
+        async_openai_client is left open.
+        """
+        with self._async_clients_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
 
     def refine_text(self, text: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT) -> str:
         """
@@ -22,14 +90,261 @@ class ChatGPTService:
         """
         if not text:
             return ''
-        response = client.chat.completions.create(model=self.model,
-        messages=[
+        key = self._cache_key(text, system_prompt)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return cached
+        response = self.rate_limiter.call(
+            self._create_completion, self._messages(text, system_prompt),
+            units=self._estimate_tokens(text, system_prompt)
+        )
+        refined = self._refined(response)
+        if self.cache:
+            self.cache.set(key, refined)
+        return refined
+
+    async def refine_text_async(self, text: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT) -> str:
+        """Async version of refine_text."""
+        if not text:
+            return ''
+        key = self._cache_key(text, system_prompt)
+        # Cache reads and writes commit to SQLite, so they stay off the event loop.
+        cached = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if cached is not None:
+            return cached
+        response = await self.rate_limiter.call_async(
+            self._create_completion_async, self._messages(text, system_prompt),
+            units=self._estimate_tokens(text, system_prompt)
+        )
+        refined = self._refined(response)
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, key, refined)
+        return refined
+
+    def refine_chunked(self, text: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT) -> str:
+        """
+        Splits the text at heading/paragraph boundaries under the token budget,
+        refines the chunks concurrently and reassembles them in order.
+        """
+        if not text:
+            return ''
+        chunks = self.split_markdown(text)
+        if len(chunks) == 1:
+            return self.refine_text(text, system_prompt)
+
+        def refine(index):
+            return self.refine_text(*self._chunk_request(chunks, index, system_prompt))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return '\n\n'.join(executor.map(refine, range(len(chunks))))
+
+    async def refine_chunked_async(self, text: str,
+                                   system_prompt: str = DEFAULT_SYSTEM_PROMPT) -> str:
+        """
+        Async version of refine_chunked: the chunks are refined concurrently with
+        asyncio.gather, at most max_workers at a time.
+        """
+        if not text:
+            return ''
+        chunks = self.split_markdown(text)
+        if len(chunks) == 1:
+            return await self.refine_text_async(text, system_prompt)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def refine(index):
+            async with semaphore:
+                return await self.refine_text_async(
+                    *self._chunk_request(chunks, index, system_prompt)
+                )
+
+        return '\n\n'.join(await asyncio.gather(*(refine(index) for index in range(len(chunks)))))
+
+    async def refine_text_stream(self, text: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT):
+        """
+        Streaming version of refine_text_async: yields the refined text in pieces
+        as the model generates it. The pieces join to the same stripped text that
+        refine_text returns, which is cached once the stream completes.
+        """
+        if not text:
+            return
+        key = self._cache_key(text, system_prompt)
+        cached = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if cached is not None:
+            yield cached
+            return
+        # The limiter holds a slot until the completion has been fully generated
+        # and retries failures before the first chunk, not part-way through.
+        stream = self.rate_limiter.stream_async(
+            self._stream_completion_async, self._messages(text, system_prompt),
+            units=self._estimate_tokens(text, system_prompt)
+        )
+        parts = []
+        async for piece in self._strip_stream(self._stream_deltas(stream)):
+            parts.append(piece)
+            yield piece
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, key, ''.join(parts))
+
+    async def refine_chunked_stream(self, text: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT):
+        """
+        Streaming version of refine_chunked_async. Chunks are refined concurrently
+        (at most max_workers at a time) but yielded in document order: the chunk
+        being yielded streams live while later ones buffer.
+        """
+        if not text:
+            return
+        chunks = self.split_markdown(text)
+        if len(chunks) == 1:
+            async for piece in self.refine_text_stream(text, system_prompt):
+                yield piece
+            return
+        semaphore = asyncio.Semaphore(self.max_workers)
+        queues = [asyncio.Queue() for _ in chunks]
+
+        async def produce(index):
+            async with semaphore:
+                try:
+                    async for piece in self.refine_text_stream(
+                        *self._chunk_request(chunks, index, system_prompt)
+                    ):
+                        await queues[index].put(piece)
+                finally:
+                    await queues[index].put(None)
+
+        tasks = [asyncio.create_task(produce(index)) for index in range(len(chunks))]
+        try:
+            for index, queue in enumerate(queues):
+                if index:
+                    yield '\n\n'
+                while (piece := await queue.get()) is not None:
+                    yield piece
+                # Re-raises the chunk's error, if any.
+                await tasks[index]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def split_markdown(self, text: str) -> list:
+        """
+        Splits markdown into chunks of at most max_chunk_tokens (estimated),
+        preferring to break before headings, then between paragraphs.
+        """
+        max_chars = self.max_chunk_tokens * self.CHARS_PER_TOKEN
+        blocks = []
+        for section in re.split(r'\n(?=#{1,6} )', text):
+            blocks.extend(
+                paragraph[i:i + max_chars]
+                for paragraph in section.split('\n\n') if paragraph.strip()
+                for i in range(0, len(paragraph), max_chars)
+            )
+            # Mark section ends so the next heading prefers to start a fresh chunk.
+            blocks.append(None)
+
+        chunks = []
+        current = []
+        current_len = 0
+        for block in blocks:
+            if block is None:
+                if current_len > max_chars // 2:
+                    chunks.append('\n\n'.join(current))
+                    current, current_len = [], 0
+                continue
+            if current and current_len + len(block) + 2 > max_chars:
+                chunks.append('\n\n'.join(current))
+                current, current_len = [], 0
+            current.append(block)
+            current_len += len(block) + 2
+        if current:
+            chunks.append('\n\n'.join(current))
+        return chunks
+
+    def _messages(self, text: str, system_prompt: str) -> list:
+        return [
             # The 'system' role provides high-level instructions and context to the model
             # This helps set the behavior and tone for the entire conversation
             {'role': 'system', 'content': system_prompt},
-        
+
             # The 'user' role contains the actual input text that needs to be processed
             # This is the content that the model will refine based on the system instructions
             {'role': 'user', 'content': text}
-        ])
-        return response.choices[0].message.content.strip()
\ No newline at end of file
+        ]
+
+    def _chunk_request(self, chunks: list, index: int, system_prompt: str) -> tuple:
+        """Returns the (text, system prompt) to refine chunk index with, including overlap context."""
+        context = self._overlap_context(chunks[index - 1]) if index else ''
+        if not context:
+            return chunks[index], system_prompt
+        prompt = f'{system_prompt}\n{self.CONTEXT_INSTRUCTIONS}'
+        return f'<context>\n{context}\n</context>\n\n{chunks[index]}', prompt
+
+    def _refined(self, response) -> str:
+        self._record_usage(response)
+        return response.choices[0].message.content.strip()
+
+    def _create_completion(self, messages: list):
+        with self.metrics.track_call('openai', 'chat.completions.create'):
+            return self.client.chat.completions.create(model=self.model, messages=messages)
+
+    async def _create_completion_async(self, messages: list):
+        with self.metrics.track_call('openai', 'chat.completions.create'):
+            return await self.async_client.chat.completions.create(
+                model=self.model, messages=messages
+            )
+
+    async def _stream_completion_async(self, messages: list):
+        """Yields the chunks of a streamed completion; the call is timed until the last one."""
+        with self.metrics.track_call('openai', 'chat.completions.create'):
+            stream = await self.async_client.chat.completions.create(
+                model=self.model, messages=messages, stream=True,
+                stream_options={'include_usage': True}
+            )
+            async for chunk in stream:
+                yield chunk
+
+    async def _stream_deltas(self, stream):
+        """Yields the content deltas of a completion stream, recording its usage."""
+        async for chunk in stream:
+            if getattr(chunk, 'usage', None):
+                self._record_usage(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    @staticmethod
+    async def _strip_stream(pieces):
+        """Drops leading and trailing whitespace from a stream of text pieces."""
+        started = False
+        pending = ''
+        async for piece in pieces:
+            if not started:
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+                started = True
+            # Hold back trailing whitespace until more text follows it.
+            text = pending + piece
+            body = text.rstrip()
+            pending = text[len(body):]
+            if body:
+                yield body
+
+    def _estimate_tokens(self, text: str, system_prompt: str) -> int:
+        """Estimates the prompt plus a completion about as long as the input text."""
+        return (len(system_prompt) + 2 * len(text)) // self.CHARS_PER_TOKEN
+
+    def _record_usage(self, response):
+        usage = getattr(response, 'usage', None)
+        if usage:
+            self.metrics.inc('polyword_openai_tokens_total', usage.prompt_tokens, kind='prompt')
+            self.metrics.inc(
+                'polyword_openai_tokens_total', usage.completion_tokens, kind='completion'
+            )
+
+    def _cache_key(self, text: str, system_prompt: str) -> str:
+        return self.cache.make_key('refine', self.model, system_prompt, text) if self.cache else ''
+
+    def _overlap_context(self, previous_chunk: str) -> str:
+        """Returns the tail of the previous chunk to pass as context."""
+        overlap_chars = self.overlap_tokens * self.CHARS_PER_TOKEN
+        if overlap_chars <= 0:
+            return ''
+        return previous_chunk[-overlap_chars:]
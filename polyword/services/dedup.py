@@ -0,0 +1,178 @@
+import asyncio
+from collections import Counter
+from polyword.metrics import MetricsRegistry, REGISTRY
+
+class DocumentSegments:
+    """
+    A document split into translation segments, each distinct segment kept
+    once in unique. layout rebuilds the document as (index into unique,
+    separator) pairs, and languages holds the detected language of the unique
+    segments that were checked.
+    """
+
+    def __init__(self):
+        self.unique = []
+        self.layout = []
+        self.languages = {}
+        self._indexes = {}
+
+    def add(self, segment: str, separator: str):
+        index = self._indexes.setdefault(segment, len(self.unique))
+        if index == len(self.unique):
+            self.unique.append(segment)
+        self.layout.append((index, separator))
+
+    def pad(self, separator: str):
+        """Appends separator after the last segment added, if any."""
+        if self.layout:
+            index, previous = self.layout[-1]
+            self.layout[-1] = (index, previous + separator)
+
+    @property
+    def total_chars(self) -> int:
+        return sum(len(self.unique[index]) for index, _ in self.layout)
+
+    def plan(self, target_language: str) -> tuple:
+        """
+        Returns the unique segment indexes that need translating into
+        target_language and the characters saved, by reason: 'duplicate' copies,
+        'untranslatable' segments without letters (page numbers, rules) and
+        segments detected as already in the target language ('same_language').
+        """
+        target = _base_language(target_language)
+        indexes = []
+        saved = {
+            'duplicate': self.total_chars - sum(len(segment) for segment in self.unique),
+            'untranslatable': 0,
+            'same_language': 0,
+        }
+        for index, segment in enumerate(self.unique):
+            if not any(char.isalpha() for char in segment):
+                saved['untranslatable'] += len(segment)
+            elif _base_language(self.languages.get(index)) == target:
+                saved['same_language'] += len(segment)
+            else:
+                indexes.append(index)
+        return indexes, saved
+
+    def assemble(self, texts: list) -> str:
+        """Rebuilds the document from one text per unique segment."""
+        return ''.join(texts[index] + separator for index, separator in self.layout).rstrip('\n')
+
+class DeduplicationService:
+    """
+    Prepares extracted text for translation so repeated content is paid for
+    once. Lines that recur at least min_repeats times (running headers,
+    footers, page numbers) become segments of their own, the rest is split
+    like TranslationService.translate_batch, and identical segments are
+    merged. With detect_language, a sample of each longer segment is checked
+    so segments already in the target language are not translated.
+    """
+
+    def __init__(self, translation_service, min_repeats: int = 3, max_line_chars: int = 120,
+                 detect_language: bool = False, detect_sample_chars: int = 200,
+                 min_detect_chars: int = 40, min_confidence: float = 0.8,
+                 metrics: MetricsRegistry = None):
+        self.translator = translation_service
+        self.min_repeats = min_repeats
+        self.max_line_chars = max_line_chars
+        self.detect_language = detect_language
+        self.detect_sample_chars = detect_sample_chars
+        self.min_detect_chars = min_detect_chars
+        self.min_confidence = min_confidence
+        self.metrics = metrics or REGISTRY
+
+    def segment(self, text: str) -> DocumentSegments:
+        """Splits and deduplicates text, detecting segment languages if enabled."""
+        segments = self._split(text)
+        if self.detect_language:
+            indexes = self._detect_indexes(segments)
+            results = self.translator.detect_languages(
+                [segments.unique[index][:self.detect_sample_chars] for index in indexes]
+            )
+            self._store_languages(segments, indexes, results)
+        return segments
+
+    async def segment_async(self, text: str) -> DocumentSegments:
+        """Async version of segment."""
+        segments = await asyncio.to_thread(self._split, text)
+        if self.detect_language:
+            indexes = self._detect_indexes(segments)
+            results = await self.translator.detect_languages_async(
+                [segments.unique[index][:self.detect_sample_chars] for index in indexes]
+            )
+            self._store_languages(segments, indexes, results)
+        return segments
+
+    async def translate_async(self, segments: DocumentSegments, target_language: str) -> tuple:
+        """
+        Translates each unique segment that needs it once and re-expands the
+        document. Returns the translated text and the characters saved.
+        """
+        indexes, saved = segments.plan(target_language)
+        texts = list(segments.unique)
+        translated = await self.translator.translate_segments_async(
+            [segments.unique[index] for index in indexes], target_language
+        )
+        for index, text in zip(indexes, translated):
+            texts[index] = text
+        for reason, chars in saved.items():
+            if chars:
+                self.metrics.inc('polyword_characters_saved_total', chars, reason=reason)
+        return segments.assemble(texts), sum(saved.values())
+
+    def _split(self, text: str) -> DocumentSegments:
+        lines = text.split('\n')
+        counts = Counter(
+            _normalize(line) for line in lines
+            if line.strip() and len(line) <= self.max_line_chars
+        )
+        repeated = {line for line, count in counts.items() if count >= self.min_repeats}
+
+        segments = DocumentSegments()
+        block = []
+
+        def flush():
+            # Other lines are split on paragraphs like translate_batch. Blank lines
+            # around them go into the separators so segments stay comparable.
+            if not block:
+                return
+            text = '\n'.join(block) + '\n'
+            block.clear()
+            core = text.strip('\n')
+            if not core:
+                segments.pad(text)
+                return
+            segments.pad('\n' * (len(text) - len(text.lstrip('\n'))))
+            trailing = '\n' * (len(text) - len(text.rstrip('\n')))
+            pieces = self.translator.split_with_separators(core)
+            for position, (segment, separator) in enumerate(pieces):
+                segments.add(segment, separator if position < len(pieces) - 1 else trailing)
+
+        for line in lines:
+            normalized = _normalize(line)
+            if normalized in repeated:
+                flush()
+                segments.add(normalized, '\n')
+            else:
+                block.append(line)
+        flush()
+        return segments
+
+    def _detect_indexes(self, segments: DocumentSegments) -> list:
+        return [
+            index for index, segment in enumerate(segments.unique)
+            if sum(char.isalpha() for char in segment) >= self.min_detect_chars
+        ]
+
+    def _store_languages(self, segments: DocumentSegments, indexes: list, results: list):
+        for index, result in zip(indexes, results):
+            if result.get('confidence', 0) >= self.min_confidence:
+                segments.languages[index] = result['language']
+
+def _normalize(line: str) -> str:
+    return ' '.join(line.split())
+
+def _base_language(language: str):
+    """'en-US' -> 'en'; None stays None."""
+    return language.split('-')[0].lower() if language else None
@@ -1,9 +1,30 @@
+import asyncio
 import json
-from google.cloud import vision
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from polyword.metrics import MetricsRegistry, REGISTRY
+
+# Vision names its output shards e.g. 'output-1-to-100.json'.
+SHARD_PATTERN = re.compile(r'output-(\d+)-to-(\d+)\.json$')
 
 class OCRService:
-    def __init__(self, vision_client=None):
-        self.client = vision_client or vision.ImageAnnotatorClient()
+    def __init__(self, vision_client=None, max_workers: int = 8,
+                 max_files_per_request: int = 100, metrics: MetricsRegistry = None,
+                 poll_interval: float = 5):
+        self._client = vision_client
+        self.max_workers = max_workers
+        self.max_files_per_request = max_files_per_request
+        self.metrics = metrics or REGISTRY
+        self.poll_interval = poll_interval
+
+    @property
+    def client(self):
+        """The Vision client, created (and the SDK imported) on first use."""
+        if self._client is None:
+            from google.cloud import vision
+            self._client = vision.ImageAnnotatorClient()
+        return self._client
 
     def async_detect_document(self, gcs_source_uri: str, gcs_destination_uri: str,
                               mime_type: str = 'application/pdf', batch_size: int = 100) -> str:
@@ -11,6 +32,102 @@ class OCRService:
         Performs async document text OCR on a PDF/TIFF file in GCS.
         Returns the GCS URI where JSON output will be written.
         """
+        operation = self.start_detect_document(
+            gcs_source_uri, gcs_destination_uri, mime_type, batch_size
+        )
+        print('Waiting for the operation to finish...')
+        with self.metrics.track_call('vision', 'operation.result'):
+            operation.result(timeout=420)
+        print('OCR operation completed')
+        return gcs_destination_uri
+
+    async def detect_document_async(self, gcs_source_uri: str, gcs_destination_uri: str,
+                                    mime_type: str = 'application/pdf', batch_size: int = 100,
+                                    timeout: float = 420) -> str:
+        """
+        Async version of async_detect_document: polls the operation instead of
+        holding a thread for the whole OCR run.
+        """
+        operation = await asyncio.to_thread(
+            self.start_detect_document, gcs_source_uri, gcs_destination_uri, mime_type, batch_size
+        )
+        deadline = time.monotonic() + timeout
+        with self.metrics.track_call('vision', 'operation.result'):
+            while not await asyncio.to_thread(operation.done):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'OCR of {gcs_source_uri} did not finish in {timeout}s')
+                await asyncio.sleep(self.poll_interval)
+            # Raises the operation's error, if any.
+            await asyncio.to_thread(operation.result)
+        print('OCR operation completed')
+        return gcs_destination_uri
+
+    def start_detect_document(self, gcs_source_uri: str, gcs_destination_uri: str,
+                              mime_type: str = 'application/pdf', batch_size: int = 100):
+        """
+        Submits async document text OCR without waiting and returns the operation.
+        """
+        async_request = self._build_request(
+            gcs_source_uri, gcs_destination_uri, mime_type, batch_size
+        )
+        with self.metrics.track_call('vision', 'async_batch_annotate_files'):
+            return self.client.async_batch_annotate_files(requests=[async_request])
+
+    def submit_documents(self, documents: list, mime_type: str = 'application/pdf',
+                         batch_size: int = 100) -> list:
+        """
+        Submits OCR for many (gcs_source_uri, gcs_destination_uri) pairs, packing up
+        to max_files_per_request files into each async_batch_annotate_files call.
+        Returns a list of (operation, documents) pairs.
+        """
+        submitted = []
+        for start in range(0, len(documents), self.max_files_per_request):
+            group = documents[start:start + self.max_files_per_request]
+            requests = [
+                self._build_request(source, destination, mime_type, batch_size)
+                for source, destination in group
+            ]
+            with self.metrics.track_call('vision', 'async_batch_annotate_files'):
+                operation = self.client.async_batch_annotate_files(requests=requests)
+            print(f'Submitted OCR for {len(group)} documents')
+            submitted.append((operation, group))
+        return submitted
+
+    def poll_operations(self, submitted: list, initial_interval: float = 5.0,
+                        max_interval: float = 60.0, timeout: float = 3600):
+        """
+        Polls the (operation, documents) pairs returned by submit_documents from a
+        single thread, backing off exponentially while nothing completes, and yields
+        (documents, error) for each operation as soon as it finishes.
+        """
+        pending = list(submitted)
+        interval = initial_interval
+        deadline = time.monotonic() + timeout
+        while pending:
+            still_pending = []
+            for operation, documents in pending:
+                if not operation.done():
+                    still_pending.append((operation, documents))
+                    continue
+                try:
+                    operation.result()
+                    yield documents, None
+                except Exception as error:
+                    yield documents, error
+            if len(still_pending) < len(pending):
+                interval = initial_interval
+            else:
+                interval = min(interval * 2, max_interval)
+            pending = still_pending
+            if not pending:
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'{len(pending)} OCR operations did not finish within {timeout}s')
+            time.sleep(interval)
+
+    def _build_request(self, gcs_source_uri: str, gcs_destination_uri: str,
+                       mime_type: str, batch_size: int):
+        from google.cloud import vision
         input_config = vision.InputConfig(
             gcs_source=vision.GcsSource(uri=gcs_source_uri),
             mime_type=mime_type
@@ -19,29 +136,97 @@ class OCRService:
             gcs_destination=vision.GcsDestination(uri=gcs_destination_uri),
             batch_size=batch_size
         )
-        async_request = vision.AsyncAnnotateFileRequest(
+        return vision.AsyncAnnotateFileRequest(
             features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
             input_config=input_config,
             output_config=output_config
         )
-        operation = self.client.async_batch_annotate_files(requests=[async_request])
-        print('Waiting for the operation to finish...')
-        operation.result(timeout=420)
-        print('OCR operation completed')
-        return gcs_destination_uri
+
+    def iter_result_shards(self, storage_service, bucket_name: str, prefix: str, operation,
+                           poll_interval: float = None, timeout: float = 420):
+        """
+        Yields (first_page, blob) for each OCR output shard under the prefix as soon
+        as it is written, until the operation has completed and every shard was seen.
+        The output is listed every poll_interval seconds (default self.poll_interval).
+        """
+        if poll_interval is None:
+            poll_interval = self.poll_interval
+        seen = set()
+        deadline = time.monotonic() + timeout
+        while True:
+            done = operation.done()
+            for blob in self._list_shards(storage_service, bucket_name, prefix):
+                if blob.name not in seen:
+                    seen.add(blob.name)
+                    yield int(SHARD_PATTERN.search(blob.name).group(1)), blob
+            if done:
+                # Surface OCR failures instead of silently returning partial output.
+                operation.result()
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'OCR operation did not finish within {timeout}s')
+            time.sleep(poll_interval)
 
     def extract_text_from_results(self, storage_service, bucket_name: str, prefix: str) -> str:
         """
         Reads OCR JSON outputs from GCS, concatenates all page texts, and returns as a single string.
         """
-        blobs = storage_service.list_blobs(bucket_name, prefix)
-        all_text = ''
-        for blob in blobs:
-            if not blob.name.endswith('.json'):
+        return ''.join(
+            text + '\n\n' for _, text in self.iter_pages(storage_service, bucket_name, prefix)
+        )
+
+    def extract_pages(self, storage_service, bucket_name: str, prefix: str) -> dict:
+        """
+        Reads OCR JSON outputs from GCS and returns a mapping of page number to page text.
+        """
+        return dict(self.iter_pages(storage_service, bucket_name, prefix))
+
+    def iter_pages(self, storage_service, bucket_name: str, prefix: str):
+        """
+        Downloads the OCR output shards concurrently and yields (page_number, text)
+        in page order as soon as each shard is available.
+        """
+        blobs = sorted(
+            self._list_shards(storage_service, bucket_name, prefix),
+            key=lambda blob: int(SHARD_PATTERN.search(blob.name).group(1))
+        )
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            shards = executor.map(lambda blob: self.read_shard_pages(storage_service, blob), blobs)
+            for pages in shards:
+                for page_number in sorted(pages):
+                    yield page_number, pages[page_number]
+
+    @staticmethod
+    def _list_shards(storage_service, bucket_name: str, prefix: str) -> list:
+        """
+        Lists the OCR output shards written directly under '{prefix}/'. Listing is
+        recursive, so shards of a sibling ('results/scan10' for 'results/scan1')
+        or of a nested run ('results/<run>/' for 'results') are skipped.
+        """
+        shard_prefix = prefix.rstrip('/') + '/' if prefix else ''
+        return [
+            blob for blob in storage_service.list_blobs(bucket_name, shard_prefix)
+            if '/' not in blob.name[len(shard_prefix):] and SHARD_PATTERN.search(blob.name)
+        ]
+
+    def extract_text_from_shard(self, storage_service, blob) -> str:
+        """
+        Reads a single OCR JSON output shard and returns its page texts.
+        """
+        pages = self.read_shard_pages(storage_service, blob)
+        return ''.join(pages[page_number] + '\n\n' for page_number in sorted(pages))
+
+    def read_shard_pages(self, storage_service, blob) -> dict:
+        """
+        Reads a single OCR JSON output shard and returns a mapping of page number to text.
+        """
+        match = SHARD_PATTERN.search(blob.name)
+        first_page = int(match.group(1)) if match else 1
+        document = json.loads(storage_service.download_blob_content(blob))
+        pages = {}
+        for offset, response in enumerate(document.get('responses', [])):
+            if 'fullTextAnnotation' not in response:
                 continue
-            content = storage_service.download_blob_content(blob)
-            document = json.loads(content)
-            for page in document.get('responses', []):
-                if 'fullTextAnnotation' in page:
-                    all_text += page['fullTextAnnotation']['text'] + '\n\n'
-        return all_text
\ No newline at end of file
+            page_number = response.get('context', {}).get('pageNumber', first_page + offset)
+            pages[page_number] = response['fullTextAnnotation']['text']
+        return pages
@@ -1,29 +1,209 @@
-from google.cloud import storage
+import asyncio
+import os
+import threading
+from polyword.metrics import MetricsRegistry, REGISTRY
+
+# Resumable upload chunk size; GCS requires a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = 32 * 256 * 1024
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 class StorageService:
-    def __init__(self, storage_client=None):
-        self.client = storage_client or storage.Client()
+    def __init__(self, storage_client=None, pool_size: int = 32,
+                 metrics: MetricsRegistry = None):
+        self._client = storage_client
+        self.pool_size = pool_size
+        self.metrics = metrics or REGISTRY
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The GCS client, created (and the SDK imported) on first use."""
+        if self._client is None:
+            import requests
+            from google.cloud import storage
+            client = storage.Client()
+            # The default session keeps only 10 connections per host, which
+            # concurrent uploads/downloads from worker threads quickly exhaust.
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.pool_size, pool_maxsize=self.pool_size
+            )
+            client._http.mount('https://', adapter)
+            self._client = client
+        return self._client
+
+    def bucket(self, bucket_name: str):
+        """
+        Returns a cached bucket handle. Unlike client.get_bucket this does not
+        make a metadata request; a missing bucket surfaces on first use.
+        """
+        with self._buckets_lock:
+            if bucket_name not in self._buckets:
+                self._buckets[bucket_name] = self.client.bucket(bucket_name)
+            return self._buckets[bucket_name]
 
     def list_blobs(self, bucket_name: str, prefix: str):
         """Lists all blobs in the bucket that begin with the prefix."""
-        bucket = self.client.get_bucket(bucket_name)
-        return bucket.list_blobs(prefix=prefix)
+        bucket = self.bucket(bucket_name)
+        with self.metrics.track_call('storage', 'list_blobs'):
+            return list(bucket.list_blobs(prefix=prefix))
+
+    def get_blob(self, bucket_name: str, blob_name: str):
+        """Returns the blob with its metadata (size, etag, content type) loaded, or None."""
+        bucket = self.bucket(bucket_name)
+        with self.metrics.track_call('storage', 'get_blob'):
+            return bucket.get_blob(blob_name)
+
+    def iter_blob_chunks(self, blob, start: int = 0, end: int = None,
+                         chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        """
+        Yields the blob's bytes from start to end (inclusive) in ranged requests of
+        at most chunk_size bytes. All chunks are read from the same blob generation.
+        """
+        end = blob.size - 1 if end is None else end
+        offset = start
+        while offset <= end:
+            chunk_end = min(offset + chunk_size - 1, end)
+            with self.metrics.track_call('storage', 'download'):
+                chunk = blob.download_as_bytes(
+                    start=offset, end=chunk_end, if_generation_match=blob.generation
+                )
+            self._transferred('download', len(chunk))
+            yield chunk
+            offset = chunk_end + 1
 
     def download_blob_content(self, blob) -> str:
         """Downloads a blob's content as a string."""
-        return blob.download_as_string().decode('utf-8')
+        with self.metrics.track_call('storage', 'download'):
+            content = blob.download_as_bytes()
+        self._transferred('download', len(content))
+        return content.decode('utf-8')
 
     def save_text(self, bucket_name: str, file_name: str, content: str) -> str:
         """Saves text content to a file in GCS and returns the GCS URI."""
-        bucket = self.client.get_bucket(bucket_name)
+        bucket = self.bucket(bucket_name)
         blob = bucket.blob(file_name)
-        blob.upload_from_string(content)
+        data = content.encode('utf-8')
+        with self.metrics.track_call('storage', 'upload'):
+            blob.upload_from_string(data, content_type='text/plain; charset=utf-8')
+        self._transferred('upload', len(data))
         print(f'Saved to gs://{bucket_name}/{file_name}')
         return f'gs://{bucket_name}/{file_name}'
 
     def upload_pdf_to_gcs(self, local_pdf_path: str, bucket_name: str, dest_blob_name: str) -> str:
         """Uploads a local PDF to GCS and returns the GCS URI."""
-        bucket = self.client.get_bucket(bucket_name)
+        bucket = self.bucket(bucket_name)
         blob = bucket.blob(dest_blob_name)
-        blob.upload_from_filename(local_pdf_path)
-        return f'gs://{bucket_name}/{dest_blob_name}'
\ No newline at end of file
+        with self.metrics.track_call('storage', 'upload'):
+            blob.upload_from_filename(local_pdf_path)
+        self._transferred('upload', os.path.getsize(local_pdf_path))
+        return f'gs://{bucket_name}/{dest_blob_name}'
+
+    async def upload_async_stream(self, chunks, bucket_name: str, dest_blob_name: str,
+                                  content_type: str = 'application/pdf',
+                                  chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+        """
+        Uploads an async iterator of byte chunks (e.g. an UploadFile being read)
+        to GCS as a chunked resumable upload, holding at most one upload chunk in
+        memory, and returns the GCS URI. Blocking GCS calls run in the default
+        executor.
+        """
+        loop = asyncio.get_running_loop()
+        bucket = self.bucket(bucket_name)
+        blob = bucket.blob(dest_blob_name)
+        self.metrics.inc('polyword_api_calls_total', service='storage', operation='upload_stream')
+        writer = await loop.run_in_executor(
+            None, lambda: blob.open('wb', chunk_size=chunk_size, content_type=content_type)
+        )
+        try:
+            async for chunk in chunks:
+                await loop.run_in_executor(None, writer.write, chunk)
+                self._transferred('upload', len(chunk))
+            await loop.run_in_executor(None, writer.close)
+        except BaseException:
+            self.metrics.inc(
+                'polyword_api_errors_total', service='storage', operation='upload_stream'
+            )
+            # Closing the writer would finalize a truncated object, so the
+            # upload is abandoned and anything already committed is removed.
+            await loop.run_in_executor(None, self._delete_quietly, blob)
+            raise
+        return f'gs://{bucket_name}/{dest_blob_name}'
+
+    def upload_bytes(self, bucket_name: str, dest_blob_name: str, data: bytes,
+                     content_type: str = 'application/octet-stream') -> str:
+        """Uploads in-memory bytes to GCS and returns the GCS URI."""
+        bucket = self.bucket(bucket_name)
+        blob = bucket.blob(dest_blob_name)
+        with self.metrics.track_call('storage', 'upload'):
+            blob.upload_from_string(data, content_type=content_type)
+        self._transferred('upload', len(data))
+        return f'gs://{bucket_name}/{dest_blob_name}'
+
+    def download_bytes(self, gcs_uri: str) -> bytes:
+        """Downloads the blob at a gs:// URI as bytes."""
+        bucket_name, blob_name = self.parse_gcs_uri(gcs_uri)
+        bucket = self.bucket(bucket_name)
+        with self.metrics.track_call('storage', 'download'):
+            data = bucket.blob(blob_name).download_as_bytes()
+        self._transferred('download', len(data))
+        return data
+
+    def load_text(self, gcs_uri: str):
+        """Downloads the text at a gs:// URI, or returns None if it does not exist."""
+        bucket_name, blob_name = self.parse_gcs_uri(gcs_uri)
+        blob = self.get_blob(bucket_name, blob_name)
+        return self.download_blob_content(blob) if blob else None
+
+    def content_hash(self, gcs_uri: str) -> str:
+        """Returns the stored content hash of the blob at a gs:// URI from its metadata."""
+        bucket_name, blob_name = self.parse_gcs_uri(gcs_uri)
+        blob = self.get_blob(bucket_name, blob_name)
+        if blob is None:
+            raise FileNotFoundError(f'{gcs_uri} does not exist')
+        # Composite objects have no MD5, only a CRC32C.
+        return blob.md5_hash or blob.crc32c
+
+    # The GCS client is synchronous, so the async variants run it in worker
+    # threads and leave the event loop free while requests are in flight.
+
+    async def get_blob_async(self, bucket_name: str, blob_name: str):
+        return await asyncio.to_thread(self.get_blob, bucket_name, blob_name)
+
+    async def iter_blob_chunks_async(self, blob, start: int = 0, end: int = None,
+                                     chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        """Async version of iter_blob_chunks; each ranged request runs in a thread."""
+        chunks = self.iter_blob_chunks(blob, start, end, chunk_size)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+
+    async def save_text_async(self, bucket_name: str, file_name: str, content: str) -> str:
+        return await asyncio.to_thread(self.save_text, bucket_name, file_name, content)
+
+    async def upload_bytes_async(self, bucket_name: str, dest_blob_name: str, data: bytes,
+                                 content_type: str = 'application/octet-stream') -> str:
+        return await asyncio.to_thread(
+            self.upload_bytes, bucket_name, dest_blob_name, data, content_type
+        )
+
+    async def download_bytes_async(self, gcs_uri: str) -> bytes:
+        return await asyncio.to_thread(self.download_bytes, gcs_uri)
+
+    async def load_text_async(self, gcs_uri: str):
+        return await asyncio.to_thread(self.load_text, gcs_uri)
+
+    def _delete_quietly(self, blob):
+        """Deletes a blob, ignoring errors (e.g. it was never created)."""
+        try:
+            blob.delete()
+        except Exception:
+            pass
+
+    def _transferred(self, direction: str, num_bytes: int):
+        self.metrics.inc('polyword_bytes_transferred_total', num_bytes, direction=direction)
+
+    @staticmethod
+    def parse_gcs_uri(gcs_uri: str) -> tuple:
+        """Splits a gs://bucket/name URI into (bucket, name)."""
+        bucket_name, _, blob_name = gcs_uri[len('gs://'):].partition('/')
+        return bucket_name, blob_name
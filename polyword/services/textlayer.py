@@ -0,0 +1,29 @@
+class TextLayerService:
+    def __init__(self, min_chars_per_page: int = 100):
+        self.min_chars_per_page = min_chars_per_page
+
+    def classify_pages(self, pdf_bytes: bytes) -> tuple:
+        """
+        Extracts the embedded text layer of each page locally.
+        Returns ({page_number: text} for pages with a dense enough text layer,
+        [page_number, ...] for pages that need OCR), page numbers starting at 1.
+        """
+        import fitz
+        text_pages = {}
+        scanned_pages = []
+        with fitz.open(stream=pdf_bytes, filetype='pdf') as document:
+            for page_number, page in enumerate(document, start=1):
+                text = page.get_text().strip()
+                if len(text) >= self.min_chars_per_page:
+                    text_pages[page_number] = text
+                else:
+                    scanned_pages.append(page_number)
+        return text_pages, scanned_pages
+
+    def build_subset_pdf(self, pdf_bytes: bytes, page_numbers: list) -> bytes:
+        """Returns a PDF containing only the given pages, in the given order."""
+        import fitz
+        with fitz.open(stream=pdf_bytes, filetype='pdf') as document, fitz.open() as subset:
+            for page_number in page_numbers:
+                subset.insert_pdf(document, from_page=page_number - 1, to_page=page_number - 1)
+            return subset.tobytes(garbage=3, deflate=True)
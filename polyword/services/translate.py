@@ -1,8 +1,31 @@
-from google.cloud import translate_v2 as translate
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from polyword.metrics import MetricsRegistry, REGISTRY
+from polyword.ratelimit import RateLimiter
 
 class TranslationService:
-    def __init__(self, translate_client=None):
-        self.client = translate_client or translate.Client()
+    # Translate v2 accepts at most 128 text segments per request.
+    MAX_SEGMENTS_PER_REQUEST = 128
+
+    def __init__(self, translate_client=None, max_chars_per_request: int = 5000,
+                 max_workers: int = 4, cache=None, metrics: MetricsRegistry = None,
+                 rate_limiter: RateLimiter = None):
+        self._client = translate_client
+        self.max_chars_per_request = max_chars_per_request
+        self.max_workers = max_workers
+        self.cache = cache
+        self.metrics = metrics or REGISTRY
+        # Budgets are in characters per minute; share one limiter between services
+        # that draw on the same quota.
+        self.rate_limiter = rate_limiter or RateLimiter('translate', metrics=self.metrics)
+
+    @property
+    def client(self):
+        """The Translate client, created (and the SDK imported) on first use."""
+        if self._client is None:
+            from google.cloud import translate_v2 as translate
+            self._client = translate.Client()
+        return self._client
 
     def translate_text(self, text: str, target_language: str) -> str:
         """
@@ -10,5 +33,217 @@ class TranslationService:
         """
         if not text:
             return ''
-        result = self.client.translate(text, target_language=target_language)
+        key = self._cache_key(text, target_language)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return cached
+        result = self.rate_limiter.call(self._request, text, target_language, units=len(text))
+        self.metrics.inc('polyword_characters_translated_total', len(text))
+        if self.cache:
+            self.cache.set(key, result['translatedText'])
         return result['translatedText']
+
+    def translate_batch(self, text: str, target_language: str) -> str:
+        """
+        Splits text on page/paragraph boundaries, translates the segments as
+        batched requests over a bounded worker pool and reassembles them in order.
+        """
+        if not text:
+            return ''
+        pieces = self.split_with_separators(text)
+        translated = self.translate_segments([segment for segment, _ in pieces], target_language)
+        return ''.join(
+            segment + separator for segment, (_, separator) in zip(translated, pieces)
+        ).rstrip('\n')
+
+    def translate_segments(self, segments: list, target_language: str) -> list:
+        """
+        Translates a list of segments, returning the translations in input order.
+        Segments found in the cache are not sent to the API.
+        """
+        translated, missing = self._lookup_cached(segments, target_language)
+        batches = self._group_segments([segments[index] for index in missing])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(
+                lambda batch: self._translate_list(batch, target_language), batches
+            )
+            fresh = [segment for batch in results for segment in batch]
+        return self._merge_fresh(segments, target_language, translated, missing, fresh)
+
+    async def translate_text_async(self, text: str, target_language: str) -> str:
+        """Async version of translate_text."""
+        if not text:
+            return ''
+        key = self._cache_key(text, target_language)
+        # Cache reads and writes commit to SQLite, so they stay off the event loop.
+        cached = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+        if cached is not None:
+            return cached
+        result = await self.rate_limiter.call_async(
+            asyncio.to_thread, self._request, text, target_language, units=len(text)
+        )
+        self.metrics.inc('polyword_characters_translated_total', len(text))
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, key, result['translatedText'])
+        return result['translatedText']
+
+    async def translate_batch_async(self, text: str, target_language: str) -> str:
+        """Async version of translate_batch."""
+        if not text:
+            return ''
+        pieces = self.split_with_separators(text)
+        translated = await self.translate_segments_async(
+            [segment for segment, _ in pieces], target_language
+        )
+        return ''.join(
+            segment + separator for segment, (_, separator) in zip(translated, pieces)
+        ).rstrip('\n')
+
+    async def translate_segments_async(self, segments: list, target_language: str) -> list:
+        """
+        Async version of translate_segments: the batches are sent concurrently
+        with asyncio.gather, at most max_workers at a time. The cache is read and
+        written in one thread hop each.
+        """
+        translated, missing = await asyncio.to_thread(
+            self._lookup_cached, segments, target_language
+        )
+        batches = self._group_segments([segments[index] for index in missing])
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def translate(batch):
+            async with semaphore:
+                return await self._translate_list_async(batch, target_language)
+
+        results = await asyncio.gather(*(translate(batch) for batch in batches))
+        fresh = [segment for batch in results for segment in batch]
+        return await asyncio.to_thread(
+            self._merge_fresh, segments, target_language, translated, missing, fresh
+        )
+
+    def detect_languages(self, texts: list) -> list:
+        """
+        Detects the language of each text, returning Translate's
+        {'language', 'confidence', 'input'} results in input order.
+        """
+        results = []
+        for batch in self._group_segments(texts):
+            results.extend(self.rate_limiter.call(
+                self._detect, batch, units=sum(len(text) for text in batch)
+            ))
+        return results
+
+    async def detect_languages_async(self, texts: list) -> list:
+        """Async version of detect_languages."""
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def detect(batch):
+            async with semaphore:
+                return await self.rate_limiter.call_async(
+                    asyncio.to_thread, self._detect, batch,
+                    units=sum(len(text) for text in batch)
+                )
+
+        results = await asyncio.gather(*(detect(batch) for batch in self._group_segments(texts)))
+        return [result for batch in results for result in batch]
+
+    def split_text(self, text: str) -> list:
+        """
+        Splits text into segments no longer than max_chars_per_request, breaking on
+        paragraph boundaries first, then on lines, then hard-wrapping.
+        """
+        return [segment for segment, _ in self.split_with_separators(text)]
+
+    def split_with_separators(self, text: str) -> list:
+        """
+        Same as split_text, returning (segment, separator) pairs so the original
+        layout can be rebuilt.
+        """
+        pieces = []
+        limit = self.max_chars_per_request
+        for paragraph in text.split('\n\n'):
+            if not paragraph.strip():
+                continue
+            if len(paragraph) <= limit:
+                pieces.append((paragraph, '\n\n'))
+                continue
+            current = ''
+            for line in paragraph.split('\n'):
+                while len(line) > limit:
+                    if current:
+                        pieces.append((current, '\n'))
+                        current = ''
+                    pieces.append((line[:limit], ''))
+                    line = line[limit:]
+                if current and len(current) + len(line) + 1 > limit:
+                    pieces.append((current, '\n'))
+                    current = ''
+                current = f'{current}\n{line}' if current else line
+            if current:
+                pieces.append((current, '\n'))
+            pieces[-1] = (pieces[-1][0], '\n\n')
+        return pieces
+
+    def _group_segments(self, segments: list) -> list:
+        """Groups segments into request-sized batches, preserving order."""
+        batches = []
+        batch = []
+        batch_chars = 0
+        for segment in segments:
+            if batch and (batch_chars + len(segment) > self.max_chars_per_request
+                          or len(batch) >= self.MAX_SEGMENTS_PER_REQUEST):
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(segment)
+            batch_chars += len(segment)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _lookup_cached(self, segments: list, target_language: str) -> tuple:
+        """Returns the cached translations (None where missing) and the missing indexes."""
+        translated = [None] * len(segments)
+        if self.cache:
+            keys = [self._cache_key(segment, target_language) for segment in segments]
+            found = self.cache.get_many(list(dict.fromkeys(keys)))
+            translated = [found.get(key) for key in keys]
+        return translated, [index for index, result in enumerate(translated) if result is None]
+
+    def _merge_fresh(self, segments: list, target_language: str, translated: list,
+                     missing: list, fresh: list) -> list:
+        """Fills in and caches the translations of the missing segments."""
+        for index, result in zip(missing, fresh):
+            translated[index] = result
+        if self.cache:
+            self.cache.set_many({
+                self._cache_key(segments[index], target_language): result
+                for index, result in zip(missing, fresh)
+            })
+        return translated
+
+    def _cache_key(self, text: str, target_language: str) -> str:
+        return self.cache.make_key('translate', target_language, text) if self.cache else ''
+
+    def _translate_list(self, segments: list, target_language: str) -> list:
+        chars = sum(len(segment) for segment in segments)
+        results = self.rate_limiter.call(self._request, segments, target_language, units=chars)
+        self.metrics.inc('polyword_characters_translated_total', chars)
+        return [result['translatedText'] for result in results]
+
+    async def _translate_list_async(self, segments: list, target_language: str) -> list:
+        # The Translate v2 client is synchronous, so each request runs in a thread.
+        chars = sum(len(segment) for segment in segments)
+        results = await self.rate_limiter.call_async(
+            asyncio.to_thread, self._request, segments, target_language, units=chars
+        )
+        self.metrics.inc('polyword_characters_translated_total', chars)
+        return [result['translatedText'] for result in results]
+
+    def _detect(self, values: list) -> list:
+        with self.metrics.track_call('translate', 'detect_language'):
+            return self.client.detect_language(values)
+
+    def _request(self, values, target_language: str):
+        with self.metrics.track_call('translate', 'translate'):
+            return self.client.translate(values, target_language=target_language)
@@ -0,0 +1,55 @@
+"""
+Measures the cold-start cost of the PolyWord entry points: for each module,
+a fresh interpreter imports it and reports the import time and which heavy
+SDKs were loaded as a side effect.
+
+    python -m polyword.startup
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+ENTRY_POINTS = ('polyword.api', 'polyword.main', 'polyword.desktop_app')
+HEAVY_MODULES = (
+    'google.cloud.vision', 'google.cloud.storage', 'google.cloud.translate_v2',
+    'openai', 'fitz', 'markdown_pdf',
+)
+
+PROBE = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+def measure(module: str) -> dict:
+    """Imports module in a fresh interpreter and returns its timing and loaded SDKs."""
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return {'error': error[-1] if error else f'exit code {completed.returncode}'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time of PolyWord entry points.')
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    for module in args.modules:
+        result = measure(module)
+        if 'error' in result:
+            print(f'{module}: failed ({result["error"]})')
+            continue
+        loaded = ', '.join(result['loaded']) or 'none'
+        print(f'{module}: {result["seconds"] * 1000:.1f} ms, heavy SDKs loaded: {loaded}')
+
+if __name__ == '__main__':
+    main()
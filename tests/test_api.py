@@ -0,0 +1,101 @@
+import importlib
+import pytest
+from benchmarks.fakes import FakeStorageClient
+from polyword.services.storage import StorageService
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    # The static files are served from polyword/static relative to the working directory.
+    static = tmp_path / 'polyword' / 'static'
+    static.mkdir(parents=True)
+    (static / 'index.html').write_text('<html>PolyWord</html>')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GOOGLE_APPLICATION_CREDENTIALS', 'gcpkey.json')
+    module = importlib.reload(importlib.import_module('polyword.api'))
+    storage_client = FakeStorageClient()
+    storage_client.bucket('polyword-bucket').objects['uploads/job/refined.txt'] = b'refined text'
+    module.services.register('storage', lambda: StorageService(storage_client=storage_client))
+    return module
+
+def test_routes_are_not_shadowed_by_the_static_mount(api):
+    client = TestClient(api.app)
+    assert client.get('/jobs/unknown').json() == {'detail': 'Job not found'}
+    assert client.get('/jobs/unknown/events').json() == {'detail': 'Job not found'}
+    assert client.get('/metrics').status_code == 200
+    assert client.post('/upload', files={'file': ('notes.txt', b'text')}).status_code == 400
+
+    download = client.get('/download/uploads/job/refined.txt')
+    assert download.status_code == 200
+    assert download.text == 'refined text'
+    assert client.get('/download/uploads/job/missing.txt').json() == {'detail': 'File not found'}
+
+def test_static_files_are_still_served(api):
+    client = TestClient(api.app)
+    assert client.get('/index.html').text == '<html>PolyWord</html>'
+
+def test_job_events_resume_after_last_event_id(api):
+    def work(job, set_stage):
+        set_stage('ocr')
+        job.publish('refined', {'language': 'en', 'text': 'Hello'})
+        set_stage('render')
+        return {'refined_pdf_uri': 'gs://polyword-bucket/uploads/job/refined_text_en.pdf'}
+
+    job = api.job_manager.submit('doc.pdf', work)
+    api.job_manager.shutdown()
+    client = TestClient(api.app)
+
+    events = client.get(f'/jobs/{job.id}/events', headers={'Last-Event-ID': '1'}).text
+    assert events == (
+        'id: 2\nevent: stage\ndata: "render"\n\n'
+        'id: 3\nevent: completed\n'
+        'data: {"refined_pdf_uri": "gs://polyword-bucket/uploads/job/refined_text_en.pdf"}\n\n'
+    )
+    assert client.get(f'/jobs/{job.id}').json()['status'] == 'completed'
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-4', (0, 4)),
+    ('bytes=3-100', (3, 11)),
+    ('bytes=8-', (8, 11)),
+    ('bytes=-4', (8, 11)),
+    ('bytes=-100', (0, 11)),
+    ('bytes=0-1,5-6', (0, 11)),
+    ('bytes=12-', None),
+    ('bytes=5-2', None),
+    ('bytes=-0', None),
+    ('bytes=a-b', None),
+    ('items=0-4', None),
+])
+def test_parse_range(api, header, expected):
+    assert api._parse_range(header, 12) == expected
+
+def test_download_answers_range_and_conditional_requests(api):
+    client = TestClient(api.app)
+    url = '/download/uploads/job/refined.txt'
+    etag = client.get(url).headers['etag']
+
+    partial = client.get(url, headers={'Range': 'bytes=0-6'})
+    assert partial.status_code == 206
+    assert partial.text == 'refined'
+    assert partial.headers['content-range'] == 'bytes 0-6/12'
+    assert partial.headers['content-length'] == '7'
+
+    suffix = client.get(url, headers={'Range': 'bytes=-4'})
+    assert (suffix.status_code, suffix.text) == (206, 'text')
+
+    unsatisfiable = client.get(url, headers={'Range': 'bytes=20-'})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers['content-range'] == 'bytes */12'
+
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': '*'}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+    # A range is only honoured if the client's copy is still current.
+    current = client.get(url, headers={'Range': 'bytes=8-', 'If-Range': etag})
+    assert (current.status_code, current.text) == (206, 'text')
+    stale = client.get(url, headers={'Range': 'bytes=8-', 'If-Range': '"stale"'})
+    assert (stale.status_code, stale.text) == (200, 'refined text')
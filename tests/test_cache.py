@@ -0,0 +1,50 @@
+import asyncio
+import threading
+from benchmarks.fakes import FakeTranslateClient
+from polyword.metrics import MetricsRegistry
+from polyword.services.cache import ResultCache
+from polyword.services.translate import TranslationService
+
+class ThreadRecordingCache(ResultCache):
+    """Records the threads the cache is used from."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.threads = set()
+
+    def get_many(self, keys: list) -> dict:
+        self.threads.add(threading.current_thread())
+        return super().get_many(keys)
+
+    def set_many(self, items: dict):
+        self.threads.add(threading.current_thread())
+        super().set_many(items)
+
+def test_get_many_and_set_many(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    cache.set_many({'a': '1', 'b': '2'})
+    assert cache.get_many(['a', 'b', 'c']) == {'a': '1', 'b': '2'}
+    assert cache.get('b') == '2'
+    assert cache.stats() == {'hits': 3, 'misses': 1}
+
+def test_set_many_evicts_the_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    cache.set('old', 'value')
+    cache.set_many({'a': '1', 'b': '2'})
+    assert cache.get('old') is None
+    assert cache.get_many(['a', 'b']) == {'a': '1', 'b': '2'}
+
+def test_async_translation_uses_the_cache_off_the_event_loop(tmp_path):
+    cache = ThreadRecordingCache(str(tmp_path / 'cache.sqlite3'))
+    client = FakeTranslateClient()
+    translator = TranslationService(translate_client=client, cache=cache, metrics=MetricsRegistry())
+    segments = ['one', 'two', 'one']
+
+    async def translate():
+        return await translator.translate_segments_async(segments, 'de'), threading.current_thread()
+
+    first, loop_thread = asyncio.run(translate())
+    assert first == ['[de] one', '[de] two', '[de] one']
+    assert asyncio.run(translate())[0] == first
+    assert cache.stats()['hits'] == 2
+    assert loop_thread not in cache.threads
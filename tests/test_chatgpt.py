@@ -0,0 +1,59 @@
+import asyncio
+from benchmarks.fakes import FakeAsyncOpenAIClient, FakeOpenAIClient
+from polyword.metrics import MetricsRegistry
+from polyword.services.chatgpt import ChatGPTService
+
+def build_service(**kwargs) -> ChatGPTService:
+    return ChatGPTService(
+        openai_client=FakeOpenAIClient(), async_openai_client=FakeAsyncOpenAIClient(),
+        metrics=MetricsRegistry(), **kwargs
+    )
+
+def markdown(sections: int) -> str:
+    return '\n'.join(
+        f'# Section {section}\n\n' + '\n\n'.join(
+            f'Paragraph {paragraph} of section {section} says something.' for paragraph in range(3)
+        )
+        for section in range(sections)
+    )
+
+def test_split_markdown_respects_the_token_budget_and_keeps_the_text():
+    service = build_service(max_chunk_tokens=40)
+    text = markdown(4)
+    chunks = service.split_markdown(text)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 40 * service.CHARS_PER_TOKEN for chunk in chunks)
+    assert '\n\n'.join(chunks) == text.replace('\n#', '\n\n#')
+
+def test_split_markdown_breaks_before_headings_first():
+    service = build_service(max_chunk_tokens=20)
+    # Both sections fit in 80 characters, but the first fills over half of them.
+    text = '# Intro\n\nA first paragraph of some length.\n# Details\n\nShort.'
+    assert service.split_markdown(text) == [
+        '# Intro\n\nA first paragraph of some length.', '# Details\n\nShort.'
+    ]
+
+def test_split_markdown_hard_splits_long_paragraphs():
+    service = build_service(max_chunk_tokens=5)
+    assert service.split_markdown('x' * 50) == ['x' * 20, 'x' * 20, 'x' * 10]
+
+def test_chunk_request_passes_the_tail_of_the_previous_chunk_as_context():
+    chunks = ['First chunk ends here.', 'Second chunk.']
+    service = build_service(overlap_tokens=2)
+    assert service._chunk_request(chunks, 0, 'prompt') == ('First chunk ends here.', 'prompt')
+    text, prompt = service._chunk_request(chunks, 1, 'prompt')
+    assert text == '<context>\nds here.\n</context>\n\nSecond chunk.'
+    assert prompt == f'prompt\n{ChatGPTService.CONTEXT_INSTRUCTIONS}'
+    assert build_service()._chunk_request(chunks, 1, 'prompt') == ('Second chunk.', 'prompt')
+
+def test_refine_chunked_reassembles_the_chunks_in_order():
+    service = build_service(max_chunk_tokens=40, max_workers=3)
+    text = markdown(4)
+    expected = '\n\n'.join(service.split_markdown(text))
+    assert service.refine_chunked(text) == expected
+    assert asyncio.run(service.refine_chunked_async(text)) == expected
+
+    async def stream():
+        return ''.join([piece async for piece in service.refine_chunked_stream(text)])
+
+    assert asyncio.run(stream()) == expected
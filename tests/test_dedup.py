@@ -0,0 +1,45 @@
+import asyncio
+import re
+from benchmarks.fakes import FakeTranslateClient
+from polyword.metrics import MetricsRegistry
+from polyword.services.dedup import DeduplicationService
+from polyword.services.translate import TranslationService
+
+PAGE = '''ACME  Annual Report
+First paragraph of page {page}
+continues on a second line.
+
+
+Second paragraph, which is long enough to be split across translation requests.
+- 1 -
+'''
+
+def build_service(max_chars_per_request: int = 5000) -> DeduplicationService:
+    metrics = MetricsRegistry()
+    translator = TranslationService(
+        translate_client=FakeTranslateClient(), max_chars_per_request=max_chars_per_request,
+        metrics=metrics
+    )
+    return DeduplicationService(translator, metrics=metrics)
+
+def document() -> str:
+    # Repeated lines differ only in spacing, as OCR output often does.
+    return '\n'.join(PAGE.format(page=page).replace('  ', ' ' * page) for page in range(1, 4))
+
+def test_assemble_rebuilds_the_document_with_repeated_lines_normalized():
+    for max_chars in (5000, 30):
+        segments = build_service(max_chars).segment(document())
+        expected = re.sub('ACME +Annual', 'ACME Annual', document()).rstrip('\n')
+        assert segments.assemble(segments.unique) == expected
+        assert 'ACME Annual Report' in segments.unique
+        assert len(segments.unique) < len(segments.layout)
+
+def test_translate_async_translates_each_unique_segment_once():
+    service = build_service()
+    segments = service.segment(document())
+    translated, saved = asyncio.run(service.translate_async(segments, 'de'))
+    assert translated.count('[de] ACME Annual Report') == 3
+    assert translated.count('[de] Second paragraph') == 3
+    # The page numbers have no letters and are left as they are.
+    assert translated.count('\n- 1 -') == 3
+    assert saved > 0
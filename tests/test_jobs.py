@@ -0,0 +1,62 @@
+import asyncio
+from polyword.jobs import JobManager
+
+def test_followers_each_receive_every_event():
+    async def main():
+        manager = JobManager(max_workers=1)
+        release = asyncio.Event()
+
+        async def work(job, set_stage):
+            set_stage('ocr')
+            await release.wait()
+            for piece in ('a', 'b', 'c'):
+                job.publish('refined', {'language': 'en', 'text': piece})
+                await asyncio.sleep(0)
+            set_stage('render')
+            return {'refined_text_uri': 'gs://bucket/refined.txt'}
+
+        job = manager.submit_async('doc.pdf', work)
+
+        async def follow():
+            return [(event, data) async for _, event, data in job.follow(poll_interval=60)]
+
+        followers = [asyncio.create_task(follow()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(*followers), 5)
+
+    for events in asyncio.run(main()):
+        assert [event for event, _ in events] == [
+            'stage', 'refined', 'refined', 'refined', 'stage', 'completed'
+        ]
+
+def test_finished_jobs_drop_refined_text_but_keep_event_ids():
+    async def main():
+        manager = JobManager(max_workers=1)
+
+        async def work(job, set_stage):
+            set_stage('refine')
+            for piece in range(1000):
+                job.publish('refined', {'language': 'en', 'text': str(piece)})
+            set_stage('render')
+            return {}
+
+        job = manager.submit_async('doc.pdf', work)
+        await asyncio.gather(*manager._tasks)
+        # A client reconnecting with Last-Event-ID 1000 resumes after that event.
+        return job, [entry async for entry in job.follow(1001)]
+
+    job, resumed = asyncio.run(main())
+    assert [event for _, event, _ in job.events] == ['stage', 'stage', 'completed']
+    assert resumed == [(1001, 'stage', 'render'), (1002, 'completed', {})]
+
+def test_threaded_jobs_wake_followers():
+    async def main():
+        manager = JobManager(max_workers=1)
+        job = manager.submit('doc.pdf', lambda job, set_stage: set_stage('ocr') or {'done': True})
+        events = [entry async for entry in job.follow(poll_interval=60)]
+        manager.shutdown()
+        return events
+
+    events = asyncio.run(asyncio.wait_for(main(), 5))
+    assert events[-1] == (1, 'completed', {'done': True})
@@ -0,0 +1,53 @@
+import json
+import time
+from benchmarks.fakes import FakeStorageClient
+from polyword.metrics import MetricsRegistry
+from polyword.services.ocr import OCRService
+from polyword.services.storage import StorageService
+
+BUCKET = 'test-bucket'
+
+class SlowOperation:
+    """Reports done on the second poll."""
+
+    def __init__(self):
+        self.polls = 0
+
+    def done(self) -> bool:
+        self.polls += 1
+        return self.polls > 1
+
+    def result(self, timeout: float = None):
+        return None
+
+def shard(*texts) -> bytes:
+    return json.dumps({'responses': [
+        {'fullTextAnnotation': {'text': text}} for text in texts
+    ]}).encode('utf-8')
+
+def test_iter_result_shards_polls_at_the_service_interval():
+    storage_client = FakeStorageClient()
+    objects = storage_client.bucket(BUCKET).objects
+    objects['results/scan1/output-1-to-1.json'] = shard('page one')
+    # A sibling prefix that starts with the same characters must not be read.
+    objects['results/scan10/output-1-to-1.json'] = shard('other document')
+    storage = StorageService(storage_client=storage_client, metrics=MetricsRegistry())
+    ocr = OCRService(vision_client=object(), poll_interval=0.01, metrics=MetricsRegistry())
+
+    started = time.monotonic()
+    shards = list(ocr.iter_result_shards(storage, BUCKET, 'results/scan1', SlowOperation()))
+    assert time.monotonic() - started < 1
+    assert [blob.name for _, blob in shards] == ['results/scan1/output-1-to-1.json']
+    assert ocr.extract_text_from_results(storage, BUCKET, 'results/scan1') == 'page one\n\n'
+
+def test_shards_of_nested_runs_are_not_read():
+    storage_client = FakeStorageClient()
+    objects = storage_client.bucket(BUCKET).objects
+    objects['results/output-1-to-1.json'] = shard('this run page 1')
+    objects['results/0f3a/output-1-to-1.json'] = shard('earlier desktop run')
+    objects['results/scan/output-1-to-2.json'] = shard('earlier batch doc', 'page 2')
+    storage = StorageService(storage_client=storage_client, metrics=MetricsRegistry())
+    ocr = OCRService(vision_client=object(), metrics=MetricsRegistry())
+
+    assert ocr.extract_text_from_results(storage, BUCKET, 'results') == 'this run page 1\n\n'
+    assert ocr.extract_pages(storage, BUCKET, 'results/scan') == {1: 'earlier batch doc', 2: 'page 2'}
@@ -0,0 +1,198 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType, SimpleNamespace
+import pytest
+from benchmarks.fakes import FakeStorageClient, FakeTranslateClient, echo_completion
+from polyword import processor as processor_module
+from polyword.manifest import RunManifest
+from polyword.metrics import MetricsRegistry
+from polyword.processor import PDFProcessor
+from polyword.services.chatgpt import ChatGPTService
+from polyword.services.storage import StorageService
+from polyword.services.translate import TranslationService
+
+BUCKET = 'test-bucket'
+
+class FakeOCRService:
+    def __init__(self):
+        self.detected = []
+
+    async def detect_document_async(self, gcs_source_uri: str, gcs_destination_uri: str):
+        self.detected.append(gcs_source_uri)
+        return gcs_destination_uri
+
+    def extract_text_from_results(self, storage_service, bucket_name: str, prefix: str) -> str:
+        return f'first page of {prefix}\n\nsecond page of {prefix}\n\n'
+
+class LoopBoundAsyncOpenAI:
+    """Like AsyncOpenAI, whose connection pool only works on the loop it was first used on."""
+
+    created = []
+
+    def __init__(self, **kwargs):
+        self.loop = asyncio.get_running_loop()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.closed = False
+        LoopBoundAsyncOpenAI.created.append(self)
+
+    async def close(self):
+        assert asyncio.get_running_loop() is self.loop, 'client closed from another event loop'
+        self.closed = True
+
+    async def _create(self, model: str, messages: list, **kwargs):
+        assert asyncio.get_running_loop() is self.loop, 'client used from another event loop'
+        await asyncio.sleep(0.01)
+        return echo_completion(messages)
+
+def build_processor(monkeypatch) -> PDFProcessor:
+    openai = ModuleType('openai')
+    openai.AsyncOpenAI = LoopBoundAsyncOpenAI
+    monkeypatch.setitem(sys.modules, 'openai', openai)
+    monkeypatch.setattr(LoopBoundAsyncOpenAI, 'created', [])
+    monkeypatch.setattr(
+        processor_module, 'render_markdown_pdf', lambda text: b'%PDF-' + text.encode('utf-8')
+    )
+    metrics = MetricsRegistry()
+    storage_client = FakeStorageClient()
+    for index in range(2):
+        storage_client.bucket(BUCKET).objects[f'input/doc-{index}.pdf'] = f'%PDF-{index}'.encode('utf-8')
+    return PDFProcessor(
+        FakeOCRService(),
+        TranslationService(translate_client=FakeTranslateClient(), metrics=metrics),
+        StorageService(storage_client=storage_client, metrics=metrics),
+        ChatGPTService(metrics=metrics),
+        metrics=metrics,
+        render_executor=ThreadPoolExecutor(max_workers=2)
+    )
+
+def test_concurrent_process_pdf_calls_use_their_own_async_client(monkeypatch):
+    processor = build_processor(monkeypatch)
+    barrier = threading.Barrier(2)
+
+    def process(index):
+        # Both calls start together so their event loops overlap.
+        barrier.wait()
+        return processor.process_pdf(
+            f'gs://{BUCKET}/input/doc-{index}.pdf', BUCKET, f'output/doc-{index}', 'de'
+        )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(process, range(2)))
+
+    for index, result in enumerate(results):
+        assert result['refined_pdf_uri'] == f'gs://{BUCKET}/output/doc-{index}/refined_text_de.pdf'
+        refined = processor.storage.load_text(result['refined_text_uri'])
+        assert refined == f'[de] first page of output/doc-{index}\n\n[de] second page of output/doc-{index}'
+    assert len(LoopBoundAsyncOpenAI.created) == 2
+    # Each call's client and its connection pool are closed along with its loop.
+    assert all(client.closed for client in LoopBoundAsyncOpenAI.created)
+
+def test_render_markdown_pdf_returns_pdf_bytes():
+    pytest.importorskip('markdown_pdf')
+    fitz = pytest.importorskip('fitz')
+    pdf_bytes = processor_module.render_markdown_pdf('# Title\n\nSome text.')
+    document = fitz.open('pdf', pdf_bytes)
+    assert document.metadata['title'] == 'Refined Document'
+    assert 'Some text.' in document[0].get_text()
+
+def test_pipelined_mode_rejects_options_it_does_not_support(monkeypatch):
+    processor = build_processor(monkeypatch)
+    for options in ({'resume': True}, {'on_refined_text': lambda language, text: None}):
+        with pytest.raises(ValueError):
+            processor.process_pdf(
+                f'gs://{BUCKET}/input/doc-0.pdf', BUCKET, 'output/doc-0', 'de',
+                pipelined=True, **options
+            )
+
+def count_calls(monkeypatch, target, name: str) -> list:
+    """Replaces an async method with a wrapper that records each call."""
+    calls = []
+    method = getattr(target, name)
+
+    async def wrapper(*args, **kwargs):
+        calls.append(args)
+        return await method(*args, **kwargs)
+
+    monkeypatch.setattr(target, name, wrapper)
+    return calls
+
+def load_stages(processor, prefix: str) -> dict:
+    return RunManifest.load(processor.storage, BUCKET, prefix).stages
+
+def test_resume_skips_the_stages_completed_before_a_failure(monkeypatch):
+    processor = build_processor(monkeypatch)
+    pdf_uri = f'gs://{BUCKET}/input/doc-0.pdf'
+    translations = count_calls(monkeypatch, processor.translator, 'translate_batch_async')
+    refine = processor.chatgpt.refine_chunked_async
+
+    async def fail(text):
+        raise RuntimeError('refinement failed')
+
+    monkeypatch.setattr(processor.chatgpt, 'refine_chunked_async', fail)
+    with pytest.raises(RuntimeError):
+        processor.process_pdf(pdf_uri, BUCKET, 'output/doc-0', 'de')
+    extracted = 'first page of output/doc-0\n\nsecond page of output/doc-0\n\n'
+    translated = '[de] first page of output/doc-0\n\n[de] second page of output/doc-0'
+    extract_hash = RunManifest.hash_inputs(processor.storage.content_hash(pdf_uri), 'ocr')
+    stages = load_stages(processor, 'output/doc-0')
+    assert sorted(stages) == ['extract', 'translate_de']
+    assert stages['extract']['input_hash'] == extract_hash
+    assert stages['translate_de']['input_hash'] == RunManifest.hash_inputs(extracted, 'de', 'True')
+
+    monkeypatch.setattr(processor.chatgpt, 'refine_chunked_async', refine)
+    result = processor.process_pdf(pdf_uri, BUCKET, 'output/doc-0', 'de', resume=True)
+    assert processor.ocr.detected == [pdf_uri]
+    assert len(translations) == 1
+    assert processor.storage.load_text(result['refined_text_uri']) == translated
+    stages = load_stages(processor, 'output/doc-0')
+    assert sorted(stages) == ['extract', 'refine_de', 'render_de', 'translate_de']
+    assert stages['extract']['input_hash'] == extract_hash
+    assert stages['refine_de']['input_hash'] == RunManifest.hash_inputs(
+        translated, processor.chatgpt.model, 'True'
+    )
+    assert stages['render_de']['input_hash'] == RunManifest.hash_inputs(translated)
+
+def test_resume_reruns_every_stage_when_the_input_pdf_changed(monkeypatch):
+    processor = build_processor(monkeypatch)
+    pdf_uri = f'gs://{BUCKET}/input/doc-0.pdf'
+    translations = count_calls(monkeypatch, processor.translator, 'translate_batch_async')
+    refinements = count_calls(monkeypatch, processor.chatgpt, 'refine_chunked_async')
+    processor.process_pdf(pdf_uri, BUCKET, 'output/doc-0', 'de')
+    processor.process_pdf(pdf_uri, BUCKET, 'output/doc-0', 'de', resume=True)
+    assert (len(processor.ocr.detected), len(translations), len(refinements)) == (1, 1, 1)
+
+    processor.storage.upload_bytes(BUCKET, 'input/doc-0.pdf', b'%PDF-edited')
+    monkeypatch.setattr(
+        processor.ocr, 'extract_text_from_results', lambda *args: 'edited page\n\n'
+    )
+    result = processor.process_pdf(pdf_uri, BUCKET, 'output/doc-0', 'de', resume=True)
+    assert processor.storage.load_text(result['refined_text_uri']) == '[de] edited page'
+    assert (len(processor.ocr.detected), len(translations), len(refinements)) == (2, 2, 2)
+    stages = load_stages(processor, 'output/doc-0')
+    assert stages['extract']['input_hash'] == RunManifest.hash_inputs(
+        processor.storage.content_hash(pdf_uri), 'ocr'
+    )
+
+def test_multi_language_runs_share_one_ocr_pass(monkeypatch):
+    processor = build_processor(monkeypatch)
+    pdf_uri = f'gs://{BUCKET}/input/doc-0.pdf'
+    stages = []
+    result = processor.process_pdf(
+        pdf_uri, BUCKET, 'output/doc-0', ['de', 'fr'], progress_callback=stages.append
+    )
+    assert processor.ocr.detected == [pdf_uri]
+    assert stages.count('ocr') == 1
+    assert {'translate_de', 'translate_fr', 'refine_de', 'refine_fr'} <= set(stages)
+    assert result['original_text_uri'] == f'gs://{BUCKET}/output/doc-0/original_text.txt'
+    for language in ('de', 'fr'):
+        assert result[f'translated_text_{language}_uri'] == (
+            f'gs://{BUCKET}/output/doc-0/translated_text_{language}.txt'
+        )
+        assert result[f'refined_pdf_{language}_uri'] == (
+            f'gs://{BUCKET}/output/doc-0/refined_text_{language}.pdf'
+        )
+        refined = processor.storage.load_text(result[f'refined_text_{language}_uri'])
+        assert refined.startswith(f'[{language}] first page of output/doc-0')
+    assert 'translated_text_uri' not in result
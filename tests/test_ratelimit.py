@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from polyword.metrics import MetricsRegistry
+from polyword.ratelimit import RateLimiter, TokenBucket
+
+class APIError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f'status {status_code}')
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+def limiter(**kwargs) -> RateLimiter:
+    kwargs.setdefault('base_delay', 0.001)
+    kwargs.setdefault('max_delay', 0.01)
+    return RateLimiter('test', metrics=MetricsRegistry(), **kwargs)
+
+def test_retries_throttled_calls_until_they_succeed():
+    rate_limiter = limiter(max_retries=3)
+    retries = []
+    rate_limiter.metrics.add_hook(lambda kind, name, value, labels: retries.append(labels['reason']))
+    outcomes = [APIError(429), APIError(503), 'done']
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert rate_limiter.call(call) == 'done'
+    assert retries == ['throttled', 'transient']
+
+def test_raises_errors_that_are_not_retryable_without_changing_the_limit():
+    rate_limiter = limiter(max_concurrency=8)
+    rate_limiter._limit = 2.0
+
+    def call():
+        raise ValueError('bad request')
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            rate_limiter.call(call)
+    assert rate_limiter._limit == 2.0
+    assert rate_limiter._in_flight == 0
+
+def test_successes_grow_the_limit_and_a_throttle_halves_it():
+    rate_limiter = limiter(max_concurrency=8, max_retries=0)
+    rate_limiter._limit = 2.0
+    for _ in range(4):
+        rate_limiter.call(lambda: None)
+    assert rate_limiter.concurrency_limit == 3
+
+    def throttled():
+        raise APIError(429)
+
+    with pytest.raises(APIError):
+        rate_limiter.call(throttled)
+    assert rate_limiter._limit < 2
+
+def test_concurrent_throttles_halve_the_limit_once():
+    rate_limiter = limiter(max_concurrency=8, max_retries=0)
+
+    async def throttled():
+        await asyncio.sleep(0.01)
+        raise APIError(429)
+
+    async def main():
+        return await asyncio.gather(
+            *(rate_limiter.call_async(throttled) for _ in range(8)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, APIError) for result in results)
+    assert rate_limiter.concurrency_limit == 4
+
+def test_retry_after_is_read_from_the_response_headers():
+    assert RateLimiter.retry_after(APIError(429, {'retry-after': '3'})) == 3.0
+    assert RateLimiter.retry_after(APIError(429, {'retry-after-ms': '250'})) == 0.25
+    assert RateLimiter.retry_after(APIError(429)) is None
+
+def test_classify():
+    assert RateLimiter.classify(APIError(429)) == 'throttled'
+    assert RateLimiter.classify(APIError(502)) == 'transient'
+    assert RateLimiter.classify(ConnectionError()) == 'transient'
+    assert RateLimiter.classify(APIError(400)) is None
+
+def test_token_bucket_delays_requests_beyond_its_capacity():
+    bucket = TokenBucket(rate=10, capacity=10)
+    now = bucket.updated
+    assert bucket.delay(10, now) == 0
+    bucket.take(10)
+    assert bucket.delay(5, now) == pytest.approx(0.5)
+
+def test_cancelled_calls_free_their_slot():
+    rate_limiter = limiter(max_concurrency=2)
+
+    async def main():
+        hanging = [
+            asyncio.create_task(rate_limiter.call_async(asyncio.sleep, 60)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        for task in hanging:
+            task.cancel()
+        await asyncio.gather(*hanging, return_exceptions=True)
+        return await asyncio.wait_for(rate_limiter.call_async(asyncio.sleep, 0, 'admitted'), 1)
+
+    assert asyncio.run(main()) == 'admitted'
+    assert rate_limiter._in_flight == 0
+    assert rate_limiter.concurrency_limit == 2
+
+def test_streams_hold_their_slot_until_consumed():
+    rate_limiter = limiter(max_concurrency=1)
+    running = []
+    peak = []
+
+    async def stream(pieces):
+        running.append(1)
+        peak.append(len(running))
+        for piece in pieces:
+            await asyncio.sleep(0.01)
+            yield piece
+        running.pop()
+
+    async def consume():
+        return [piece async for piece in rate_limiter.stream_async(stream, ['a', 'b'])]
+
+    async def run():
+        return await asyncio.gather(*(consume() for _ in range(6)))
+
+    assert asyncio.run(run()) == [['a', 'b']] * 6
+    assert max(peak) == 1
+    assert rate_limiter._in_flight == 0
+
+def test_streams_retry_before_the_first_item_and_adapt_to_throttling_after_it():
+    rate_limiter = limiter(max_concurrency=8, max_retries=3)
+    attempts = []
+
+    async def stream():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise APIError(503)
+        yield 'first'
+        raise APIError(429)
+
+    async def consume(pieces):
+        async for piece in rate_limiter.stream_async(stream):
+            pieces.append(piece)
+
+    pieces = []
+    with pytest.raises(APIError):
+        asyncio.run(consume(pieces))
+    # The throttle part-way through is not retried, which would repeat 'first'.
+    assert pieces == ['first']
+    assert len(attempts) == 2
+    assert rate_limiter.concurrency_limit == 4
+    assert rate_limiter._in_flight == 0
+
+def test_a_stream_closed_early_frees_its_slot():
+    rate_limiter = limiter(max_concurrency=1)
+
+    async def stream():
+        while True:
+            yield 'piece'
+            await asyncio.sleep(0)
+
+    async def run():
+        pieces = rate_limiter.stream_async(stream)
+        assert await pieces.__anext__() == 'piece'
+        await pieces.aclose()
+        return rate_limiter._in_flight
+
+    assert asyncio.run(run()) == 0
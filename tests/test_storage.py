@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+from benchmarks.fakes import FakeStorageClient
+from polyword.metrics import MetricsRegistry
+from polyword.services.storage import StorageService
+
+BUCKET = 'test-bucket'
+
+async def read_chunks(chunks, error: Exception = None):
+    for chunk in chunks:
+        yield chunk
+    if error:
+        raise error
+
+def test_upload_async_stream_finalizes_a_complete_upload():
+    storage_client = FakeStorageClient()
+    storage = StorageService(storage_client=storage_client, metrics=MetricsRegistry())
+    uri = asyncio.run(storage.upload_async_stream(read_chunks([b'%PDF', b'-1.7']), BUCKET, 'scan.pdf'))
+    assert uri == f'gs://{BUCKET}/scan.pdf'
+    assert storage_client.bucket(BUCKET).objects['scan.pdf'] == b'%PDF-1.7'
+
+def test_upload_async_stream_does_not_finalize_a_failed_upload():
+    storage_client = FakeStorageClient()
+    metrics = MetricsRegistry()
+    storage = StorageService(storage_client=storage_client, metrics=metrics)
+    chunks = read_chunks([b'%PDF'], ConnectionResetError('client went away'))
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(storage.upload_async_stream(chunks, BUCKET, 'scan.pdf'))
+    assert 'scan.pdf' not in storage_client.bucket(BUCKET).objects
+    assert ('polyword_api_errors_total{operation="upload_stream",service="storage"} 1'
+            in metrics.render_prometheus())
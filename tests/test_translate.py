@@ -0,0 +1,59 @@
+import pytest
+from benchmarks.fakes import FakeTranslateClient
+from polyword.metrics import MetricsRegistry
+from polyword.services.translate import TranslationService
+
+TEXT = '''# Report
+
+First paragraph, first line.
+Second line of the first paragraph.
+
+A single line paragraph that is rather long compared to the others here.
+Short tail.
+
+Last paragraph.'''
+
+def build_service(max_chars_per_request: int = 5000) -> TranslationService:
+    return TranslationService(
+        translate_client=FakeTranslateClient(), max_chars_per_request=max_chars_per_request,
+        metrics=MetricsRegistry()
+    )
+
+@pytest.mark.parametrize('limit', [5000, 60, 40, 7])
+def test_split_with_separators_respects_the_limit_and_round_trips(limit):
+    pieces = build_service(limit).split_with_separators(TEXT)
+    assert all(0 < len(segment) <= limit for segment, _ in pieces)
+    assert ''.join(segment + separator for segment, separator in pieces).rstrip('\n') == TEXT
+
+def test_split_with_separators_keeps_paragraphs_and_lines_apart():
+    pieces = build_service(60).split_with_separators(TEXT)
+    assert pieces[:3] == [
+        ('# Report', '\n\n'),
+        ('First paragraph, first line.', '\n'),
+        ('Second line of the first paragraph.', '\n\n'),
+    ]
+
+def test_split_with_separators_hard_wraps_long_lines():
+    pieces = build_service(10).split_with_separators('short\n' + 'x' * 25 + '\n\nend')
+    assert pieces == [
+        ('short', '\n'),
+        ('x' * 10, ''),
+        ('x' * 10, ''),
+        ('x' * 5, '\n\n'),
+        ('end', '\n\n'),
+    ]
+
+def test_group_segments_caps_characters_and_segments_per_request():
+    service = build_service(10)
+    assert service._group_segments(['abcd', 'efgh', 'ij', 'klmnopqrstu', 'v']) == [
+        ['abcd', 'efgh', 'ij'], ['klmnopqrstu'], ['v']
+    ]
+    batches = build_service()._group_segments(['a'] * 300)
+    assert [len(batch) for batch in batches] == [
+        TranslationService.MAX_SEGMENTS_PER_REQUEST, TranslationService.MAX_SEGMENTS_PER_REQUEST, 44
+    ]
+
+def test_translate_batch_rebuilds_the_layout():
+    assert build_service(6).translate_batch('One.\nTwo.\n\nThree.', 'de') == (
+        '[de] One.\n[de] Two.\n\n[de] Three.'
+    )